@@ -0,0 +1,192 @@
+import copy
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+_NAO_ALFANUMERICO = re.compile(r'[^0-9a-z]')
+
+
+# 'Patrimônio Líquido Consolidado', 'PatrimônioLíquido Consolidado' e
+# 'patrimonio liquido consolidado' viram todos 'patrimonioliquidoconsolidado'.
+def normalizar_descricao(descricao):
+    sem_acento = unicodedata.normalize('NFKD', str(descricao)).encode('ascii', 'ignore').decode('ascii')
+    return _NAO_ALFANUMERICO.sub('', sem_acento.casefold())
+
+
+# Contas de vários anos de uma vez, com uma linha por chave (ano, ou
+# companhia e ano): uma tabela larga por código e, para as buscas pela
+# descrição, as linhas originais. As descrições livres são milhares por
+# companhia, então em vez de uma coluna por descrição cada busca filtra as
+# linhas e soma por chave. Cada consulta devolve uma série alinhada por
+# essas chaves.
+class PainelContas:
+    def __init__(self, df, chaves=('Ano',)):
+        grupos = [df[c] for c in chaves]
+        valores = df['VL_CONTA'].fillna(0)
+        self.por_codigo = valores.groupby(grupos + [df['CD_CONTA'].astype(str)], observed=True).sum().unstack(fill_value=0.0)
+        por_chave = valores.groupby(grupos, observed=True)
+        self._indice = por_chave.size().index
+        self._linha = por_chave.ngroup().to_numpy()
+        self._valores = valores.to_numpy(dtype='float64')
+        self._ds = df['DS_CONTA']
+        self._descricoes = None
+        self._janela = None
+        self._contendo = {}
+
+    # descrições normalizadas montadas na primeira busca, uma vez por
+    # descrição distinta; cada linha guarda a posição da sua
+    def _normalizadas(self):
+        if self._descricoes is None:
+            codigos, unicas = pd.factorize(self._ds.astype(str))
+            self._descricoes = (codigos, [normalizar_descricao(d) for d in unicas])
+        return self._descricoes
+
+    def _somar(self, selecionadas):
+        codigos, _ = self._normalizadas()
+        linhas = np.asarray(selecionadas, dtype=bool)[codigos] & (codigos >= 0)
+        soma = np.bincount(self._linha[linhas], weights=self._valores[linhas], minlength=len(self._indice))
+        serie = pd.Series(soma, index=self._indice)
+        if self._janela is not None:
+            serie = _somar_janela(serie, *self._janela)
+        return serie.reindex(self.por_codigo.index, fill_value=0.0)
+
+    def codigo(self, *codigos):
+        return self.por_codigo.reindex(columns=list(codigos), fill_value=0.0).sum(axis=1)
+
+    def descricao(self, *descricoes):
+        procuradas = {normalizar_descricao(d) for d in descricoes}
+        return self._somar([d in procuradas for d in self._normalizadas()[1]])
+
+    def contendo(self, *termos):
+        # cada linha entra uma vez, mesmo que contenha mais de um termo
+        termos = tuple(normalizar_descricao(t) for t in termos)
+        if termos not in self._contendo:
+            self._contendo[termos] = self._somar([any(t in d for t in termos) for d in self._normalizadas()[1]])
+        return self._contendo[termos]
+
+    def __contains__(self, codigo):
+        return codigo in self.por_codigo.columns
+
+    # Soma móvel de 'periodos' linhas consecutivas do nível indicado: com
+    # trimestres isolados e periodos=4, os últimos doze meses (TTM). Chaves
+    # sem a janela completa saem do painel. As buscas pela descrição somam
+    # nas chaves originais e aplicam a mesma janela.
+    def janela(self, periodos, nivel='Trimestre'):
+        novo = copy.copy(self)
+        novo.por_codigo = _somar_janela(self.por_codigo, periodos, nivel)
+        novo._janela = (periodos, nivel)
+        novo._contendo = {}
+        return novo
+
+
+# Índice com o nível indicado recuado 'periodos' posições (ano - 1, ou
+# trimestre - 4); os demais níveis (CD_CVM) ficam como estão.
+def deslocar(indice, periodos, nivel):
+    if not isinstance(indice, pd.MultiIndex):
+        return indice - periodos
+    niveis = [indice.get_level_values(n) for n in range(indice.nlevels)]
+    posicao = indice.names.index(nivel)
+    niveis[posicao] = niveis[posicao] - periodos
+    return pd.MultiIndex.from_arrays(niveis, names=indice.names)
+
+
+def _somar_janela(tabela, periodos, nivel):
+    total = tabela
+    for k in range(1, periodos):
+        total = total + tabela.reindex(deslocar(tabela.index, k, nivel)).set_axis(tabela.index)
+    return total.dropna(how='any')
+
+
+# Códigos cujos filhos não somam o pai: lucro por ação (por espécie e
+# classe) e a variação de caixa da DFC (saldo inicial e final).
+SEM_SOMA = ('3.99', '6.05')
+# diferença aceita entre o pai e a soma dos filhos, na unidade do arquivo
+TOLERANCIA = 1.0
+
+
+def codigo_pai(codigo):
+    return codigo.rsplit('.', 1)[0] if '.' in codigo else None
+
+
+def _prefixos(codigo):
+    partes = codigo.split('.')
+    return ['.'.join(partes[:n]) for n in range(1, len(partes) + 1)]
+
+
+# Soma dos filhos diretos em cada pai, para todas as linhas de uma vez:
+# filhos e pais são posições de coluna, agrupadas por pai, e cada grupo vira
+# uma fatia do reduceat. Pai sem nenhum filho declarado fica NaN.
+def _soma_dos_filhos(valores, filhos, pais):
+    resultado = np.full(valores.shape, np.nan)
+    if not len(filhos):
+        return resultado
+    inicio = np.flatnonzero(np.r_[True, pais[1:] != pais[:-1]])
+    bloco = valores[:, filhos]
+    soma = np.add.reduceat(np.nan_to_num(bloco), inicio, axis=1)
+    presentes = np.add.reduceat((~np.isnan(bloco)).astype('int64'), inicio, axis=1)
+    resultado[:, pais[inicio]] = np.where(presentes > 0, soma, np.nan)
+    return resultado
+
+
+# Árvore de contas pelo prefixo do CD_CONTA ('2.01.02' é filha de '2.01',
+# que é filha de '2'), com uma linha por chave (companhia e ano) e uma
+# coluna por código. subtotais tem todos os prefixos: o valor declarado ou,
+# quando o nível não foi declarado, a soma dos filhos, montada uma vez de
+# baixo para cima, um nível de profundidade por vez; subtotal(codigo) é só
+# a leitura de uma coluna. conferir() compara cada pai declarado com a soma
+# dos filhos diretos para todas as companhias de uma vez.
+class ArvoreContas:
+    def __init__(self, df, chaves=('CD_CVM', 'Ano')):
+        grupos = [df[c] for c in chaves]
+        codigos = df['CD_CONTA'].astype(str)
+        # sem fill: conta não declarada fica NaN e não entra na conferência
+        self.tabela = df['VL_CONTA'].groupby(grupos + [codigos], observed=True).sum(min_count=1).unstack()
+        self.codigos = sorted({p for c in self.tabela.columns for p in _prefixos(c)},
+                              key=lambda p: [int(n) if n.isdigit() else n for n in p.split('.')])
+        self.pais = {c: codigo_pai(c) for c in self.codigos}
+        self.filhos = {}
+        for codigo, pai in self.pais.items():
+            if pai is not None:
+                self.filhos.setdefault(pai, []).append(codigo)
+
+        posicao = {c: i for i, c in enumerate(self.codigos)}
+        ligacoes = sorted((posicao[p], posicao[c]) for c, p in self.pais.items() if p is not None)
+        self._pais = np.array([p for p, _ in ligacoes], dtype='int64')
+        self._filhos = np.array([f for _, f in ligacoes], dtype='int64')
+        profundidades = np.array([self.codigos[f].count('.') for f in self._filhos], dtype='int64')
+        self.declarados = self.tabela.reindex(columns=self.codigos).to_numpy(dtype='float64')
+        valores = self.declarados.copy()
+        for nivel in range(profundidades.max(initial=0), 0, -1):
+            mesmo_nivel = profundidades == nivel
+            soma = _soma_dos_filhos(valores, self._filhos[mesmo_nivel], self._pais[mesmo_nivel])
+            valores = np.where(np.isnan(valores), soma, valores)
+        self.subtotais = pd.DataFrame(valores, index=self.tabela.index, columns=self.codigos)
+
+    def subtotal(self, codigo):
+        if codigo not in self.subtotais.columns:
+            return pd.Series(np.nan, index=self.subtotais.index)
+        return self.subtotais[codigo]
+
+    # Pais declarados cuja soma dos filhos diretos (declarados ou já
+    # somados) difere do valor em mais que a tolerância: uma linha por
+    # (chave, CD_CONTA) quebrado, com o valor, a soma e a diferença.
+    def conferir(self, tolerancia=TOLERANCIA):
+        soma = _soma_dos_filhos(self.subtotais.to_numpy(), self._filhos, self._pais)
+        diferenca = self.declarados - soma
+        conferidos = np.array([not any(c == s or c.startswith(s + '.') for s in SEM_SOMA) for c in self.codigos])
+        with np.errstate(invalid='ignore'):
+            quebrado = (np.abs(diferenca) > tolerancia) & conferidos
+        linhas, colunas = np.nonzero(quebrado)
+        indice = self.subtotais.index[linhas]
+        resultado = pd.DataFrame({'CD_CONTA': np.asarray(self.codigos)[colunas],
+                                  'valor': self.declarados[linhas, colunas],
+                                  'soma_filhos': soma[linhas, colunas],
+                                  'diferenca': diferenca[linhas, colunas]},
+                                 index=indice)
+        return resultado.set_index('CD_CONTA', append=True)
+
+    # chaves (companhia e ano) com algum pai quebrado
+    def quebrados(self, tolerancia=TOLERANCIA):
+        return self.conferir(tolerancia).index.droplevel('CD_CONTA').unique()
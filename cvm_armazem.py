@@ -0,0 +1,270 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import pandas as pd
+
+from cvm_dados import (CHAVE_VERSAO, REGISTRO, RegistroArquivos, aplicar_esquema, codigos_ordem, filtrar_bloco,
+                       ler_csv, manter_ultima_versao)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # sem pyarrow o armazém fica desligado e tudo sai dos ZIPs
+    pa = pq = None
+
+# Armazém colunar: cada ZIP anual vira, uma única vez, um Parquet por
+# demonstrativo e consolidação, ordenado por CD_CVM para que os row groups
+# possam ser descartados pelas estatísticas na leitura.
+#   <ARMAZEM_DIR>/tipo_periodo=DFP/ano=2020/demonstrativo=BPA/consolidacao=con/dados.parquet
+ARMAZEM_DIR = os.environ.get('APSCONT_ARMAZEM', os.path.join(os.path.expanduser('~'), '.cache', 'apscont', 'armazem'))
+LINHAS_POR_GRUPO = 20_000
+_MEMBRO = re.compile(r'^(?P<tipo>[a-z]+)_cia_aberta_(?P<cod>[A-Z_]+)_(?P<cons>con|ind)_(?P<ano>\d{4})\.csv$')
+
+
+def armazem_disponivel():
+    return pq is not None
+
+
+def _dir_ano(ano, tipo_periodo, diretorio):
+    return os.path.join(diretorio, f'tipo_periodo={tipo_periodo.upper()}', f'ano={ano}')
+
+
+def caminho_particao(ano, cod, tipo_periodo, tipo_demonstrativo, diretorio=None):
+    return os.path.join(_dir_ano(ano, tipo_periodo, diretorio or ARMAZEM_DIR),
+                        f'demonstrativo={cod}', f'consolidacao={tipo_demonstrativo}', 'dados.parquet')
+
+
+def _ler_json(caminho):
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _origem(ano, tipo_periodo, diretorio):
+    return _ler_json(os.path.join(_dir_ano(ano, tipo_periodo, diretorio or ARMAZEM_DIR), '_origem.json'))
+
+
+# Demonstrativos ('BPA_con', 'DRE_ind', ...) já no armazém para o ano, como
+# _origem.json registra; None quando o ano foi ingerido inteiro (e nos
+# armazéns gravados antes da ingestão por membro).
+def _ingeridos(origem):
+    return set(origem['demonstrativos']) if 'demonstrativos' in origem else None
+
+
+# demonstrativos=None pergunta pelo ano inteiro
+def ingerido(ano, tipo_periodo, diretorio=None, demonstrativos=None):
+    origem = _origem(ano, tipo_periodo, diretorio)
+    if not origem:
+        return False
+    feitos = _ingeridos(origem)
+    return feitos is None or (demonstrativos is not None and set(demonstrativos) <= feitos)
+
+
+def _gravar_json(caminho, dados):
+    tmp = caminho + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+    os.replace(tmp, caminho)
+
+
+# Manifesto do membro: por CD_CVM, a maior VERSAO e um hash do conteúdo das
+# linhas (soma dos hashes por linha, que não depende da ordem).
+def manifesto_membro(df):
+    if df.empty:
+        return {}
+    hashes = pd.util.hash_pandas_object(df.drop(columns=['CD_CVM']), index=False)
+    resumo = pd.DataFrame({'CD_CVM': df['CD_CVM'].to_numpy(), 'VERSAO': df['VERSAO'].to_numpy(), 'HASH': hashes.to_numpy()})
+    resumo = resumo.groupby('CD_CVM').agg(VERSAO=('VERSAO', 'max'), HASH=('HASH', 'sum'))
+    return {cd: [None if pd.isna(v) else int(v), format(int(h), '016x')]
+            for cd, v, h in zip(resumo.index, resumo['VERSAO'], resumo['HASH'])}
+
+
+def _ingerir_membro(zf, nome, dir_ano, cod, cons):
+    df = ler_csv(zf.open(nome))
+    df = df.sort_values(['CD_CVM', 'DT_FIM_EXERC'], kind='stable').reset_index(drop=True)
+    caminho = os.path.join(dir_ano, f'demonstrativo={cod}', f'consolidacao={cons}', 'dados.parquet')
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), caminho + '.tmp', row_group_size=LINHAS_POR_GRUPO)
+    os.replace(caminho + '.tmp', caminho)
+    return manifesto_membro(df)
+
+
+def _membros(zf):
+    membros = {}
+    for info in zf.infolist():
+        m = _MEMBRO.match(info.filename)
+        if m is not None:
+            membros[info.filename] = (m['cod'], m['cons'], f'{info.CRC:08x}:{info.file_size}')
+    return membros
+
+
+# Ingestão do ano inteiro (demonstrativos=None) ou só dos membros pedidos,
+# por exemplo {'BPA_con', 'BPP_con'}. O ano inteiro é montado num diretório
+# temporário e trocado de uma vez; membros avulsos são gravados no lugar
+# (cada Parquet é trocado atomicamente) e acrescentados ao _origem.json, e o
+# ZIP só precisa ser aberto inteiro no primeiro caso.
+def ingerir_arquivo(ano, tipo_periodo, registro=REGISTRO, diretorio=None, forcar=False, demonstrativos=None):
+    if pq is None:
+        raise ImportError('o armazém colunar precisa do pyarrow (pip install pyarrow)')
+    diretorio = diretorio or ARMAZEM_DIR
+    destino = _dir_ano(ano, tipo_periodo, diretorio)
+    if not forcar and ingerido(ano, tipo_periodo, diretorio, demonstrativos):
+        return destino
+    if demonstrativos is None:
+        return _ingerir_ano(ano, tipo_periodo, registro, destino)
+
+    origem = _origem(ano, tipo_periodo, diretorio)
+    feitos = _ingeridos(origem) if origem else set()
+    pendentes = set(demonstrativos) if forcar or feitos is None else set(demonstrativos) - feitos
+    zf = registro.arquivo(ano, tipo_periodo)
+    os.makedirs(destino, exist_ok=True)
+    manifesto = ler_manifesto(ano, tipo_periodo, diretorio)
+    assinaturas = origem.get('membros', {})
+    for nome, (cod, cons, assinatura) in _membros(zf).items():
+        if f'{cod}_{cons}' in pendentes:
+            manifesto[f'{cod}_{cons}'] = _ingerir_membro(zf, nome, destino, cod, cons)
+            assinaturas[nome] = assinatura
+
+    _gravar_json(os.path.join(destino, '_manifesto.json'), manifesto)
+    origem = {'arquivo': os.path.basename(zf.filename or ''), 'membros': assinaturas}
+    if feitos is not None:
+        # pedidos que o ZIP não tem também contam, para não reabri-lo a cada leitura
+        origem['demonstrativos'] = sorted(feitos | pendentes)
+    _gravar_json(os.path.join(destino, '_origem.json'), origem)
+    return destino
+
+
+def _ingerir_ano(ano, tipo_periodo, registro, destino):
+    zf = registro.arquivo(ano, tipo_periodo, inteiro=True)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(destino), prefix=f'.ano={ano}.')
+    membros = _membros(zf)
+    manifesto = {}
+    for nome, (cod, cons, _) in membros.items():
+        manifesto[f'{cod}_{cons}'] = _ingerir_membro(zf, nome, tmp, cod, cons)
+
+    _gravar_json(os.path.join(tmp, '_manifesto.json'), manifesto)
+    _gravar_json(os.path.join(tmp, '_origem.json'),
+                 {'arquivo': os.path.basename(zf.filename or ''), 'membros': {n: m[2] for n, m in membros.items()}})
+    # troca a partição do ano inteira de uma vez para nunca ler um ano pela metade
+    if os.path.exists(destino):
+        shutil.rmtree(destino)
+    os.replace(tmp, destino)
+    return destino
+
+
+def ler_manifesto(ano, tipo_periodo, diretorio=None):
+    return _ler_json(os.path.join(_dir_ano(ano, tipo_periodo, diretorio or ARMAZEM_DIR), '_manifesto.json'))
+
+
+# Atualização incremental: reabre o arquivo anual na fonte, reprocessa só os
+# membros cujo CRC mudou e compara o manifesto novo com o antigo. Devolve
+# {ano: {CD_CVM: {'BPA_con', ...}}} com as companhias cujo conteúdo ou VERSAO
+# mudou; ao_mudar(ano, cd_cvms) é chamado para cada ano com mudanças, para
+# recalcular indicadores só dessas companhias. Num ano ingerido só em parte,
+# só os membros já no armazém são conferidos; os outros continuam sendo
+# ingeridos quando alguém os lê.
+def atualizar(anos, tipo_periodo, diretorio=None, ao_mudar=None, registro=None):
+    if pq is None:
+        raise ImportError('o armazém colunar precisa do pyarrow (pip install pyarrow)')
+    diretorio = diretorio or ARMAZEM_DIR
+    proprio = registro is None
+    registro = registro or RegistroArquivos()
+    mudancas = {}
+    try:
+        for ano in anos:
+            if not _origem(ano, tipo_periodo, diretorio):
+                ingerir_arquivo(ano, tipo_periodo, registro, diretorio)
+                novas = {}
+                for membro, companhias in ler_manifesto(ano, tipo_periodo, diretorio).items():
+                    for cd in companhias:
+                        novas.setdefault(cd, set()).add(membro)
+            else:
+                novas = _atualizar_ano(ano, tipo_periodo, registro, diretorio)
+            if novas:
+                mudancas[ano] = novas
+                if ao_mudar is not None:
+                    ao_mudar(ano, set(novas))
+    finally:
+        if proprio:
+            registro.fechar()
+    return mudancas
+
+
+def _atualizar_ano(ano, tipo_periodo, registro, diretorio):
+    dir_ano = _dir_ano(ano, tipo_periodo, diretorio)
+    origem = _ler_json(os.path.join(dir_ano, '_origem.json'))
+    feitos = _ingeridos(origem)
+    manifesto = ler_manifesto(ano, tipo_periodo, diretorio)
+    zf = registro.arquivo(ano, tipo_periodo)
+    membros = {nome: m for nome, m in _membros(zf).items() if feitos is None or f'{m[0]}_{m[1]}' in feitos}
+    assinaturas = origem.get('membros', {})
+    if not isinstance(assinaturas, dict):
+        assinaturas = {}
+
+    mudancas = {}
+    for nome, (cod, cons, assinatura) in membros.items():
+        if assinaturas.get(nome) == assinatura:
+            continue
+        chave = f'{cod}_{cons}'
+        antigo = manifesto.get(chave, {})
+        novo = _ingerir_membro(zf, nome, dir_ano, cod, cons)
+        for cd in set(antigo) | set(novo):
+            if antigo.get(cd) != novo.get(cd):
+                mudancas.setdefault(cd, set()).add(chave)
+        manifesto[chave] = novo
+
+    _gravar_json(os.path.join(dir_ano, '_manifesto.json'), manifesto)
+    origem = {'arquivo': os.path.basename(zf.filename or ''), 'membros': {n: m[2] for n, m in membros.items()}}
+    if feitos is not None:
+        origem['demonstrativos'] = sorted(feitos)
+    _gravar_json(os.path.join(dir_ano, '_origem.json'), origem)
+    return mudancas
+
+
+# Abre em paralelo os anos que ainda não têm os demonstrativos pedidos no
+# armazém (todos, com demonstrativos=None) e os ingere.
+def preparar_anos(anos, tipo_periodo, registro=REGISTRO, diretorio=None, demonstrativos=None):
+    anos = [ano for ano in anos if pq is None or not ingerido(ano, tipo_periodo, diretorio, demonstrativos)]
+    registro.pre_carregar(anos, tipo_periodo, inteiro=demonstrativos is None)
+    if pq is not None:
+        for ano in anos:
+            ingerir_arquivo(ano, tipo_periodo, registro, diretorio, demonstrativos=demonstrativos)
+
+
+def ler_armazem(ano, cod, tipo_periodo, tipo_demonstrativo, usecols=None, diretorio=None,
+                cd_cvm=None, ano_exercicio=None, ordem_exerc=None):
+    caminho = caminho_particao(ano, cod, tipo_periodo, tipo_demonstrativo, diretorio)
+    filtros = []
+    if cd_cvm is not None:
+        filtros.append(('CD_CVM', 'in', sorted({cd_cvm} if isinstance(cd_cvm, str) else set(cd_cvm))))
+    if ordem_exerc is not None:
+        ordem_exerc = {ordem_exerc} if isinstance(ordem_exerc, (str, int)) else set(ordem_exerc)
+        if pa.types.is_integer(pq.read_schema(caminho).field('ORDEM_EXERC').type):
+            ordem_exerc = codigos_ordem(ordem_exerc)
+        filtros.append(('ORDEM_EXERC', 'in', sorted(ordem_exerc)))
+    colunas = None
+    if usecols is not None:
+        colunas = list(dict.fromkeys(list(usecols) + (['DT_FIM_EXERC'] if ano_exercicio is not None else [])
+                                     + list(CHAVE_VERSAO) + ['VERSAO']))
+    tabela = pq.read_table(caminho, columns=colunas, filters=filtros or None)
+    df = manter_ultima_versao(aplicar_esquema(tabela.to_pandas()))
+    df = filtrar_bloco(df, ano_exercicio=ano_exercicio)
+    if usecols is not None:
+        df = df[list(usecols)]
+    return df.reset_index(drop=True)
+
+
+# Ponto de entrada usado pelos scripts: ingere o membro na primeira vez e
+# depois só lê colunas e row groups necessários; sem pyarrow, volta a ler do
+# ZIP.
+def carregar_demonstrativo(ano, cod, tipo_periodo, tipo_demonstrativo, usecols=None, **filtros):
+    if pq is None:
+        return ler_csv(REGISTRO.abrir(ano, cod, tipo_periodo, tipo_demonstrativo), usecols=usecols, **filtros)
+    ingerir_arquivo(ano, tipo_periodo, demonstrativos=[f'{cod}_{tipo_demonstrativo}'])
+    return ler_armazem(ano, cod, tipo_periodo, tipo_demonstrativo, usecols=usecols, **filtros)
@@ -0,0 +1,756 @@
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from zipfile import ZipFile
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import fcntl
+except ImportError:  # Windows: só a trava entre threads do mesmo processo
+    fcntl = None
+
+# Cache em disco dos ZIPs da CVM: os arquivos ficam em objetos/<sha256>.zip
+# (endereçados pelo conteúdo) e o indice.json guarda, por URL, o hash, os
+# cabeçalhos de validação (ETag / Last-Modified) e o último acesso (LRU).
+CACHE_DIR = os.environ.get('APSCONT_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'apscont'))
+CACHE_LIMITE_BYTES = int(os.environ.get('APSCONT_CACHE_LIMITE', 2 * 1024 ** 3))
+MODO_OFFLINE = os.environ.get('APSCONT_OFFLINE', '') not in ('', '0')
+TIMEOUT = 60
+DOWNLOADS_SIMULTANEOS = int(os.environ.get('APSCONT_DOWNLOADS', 4))
+MODO_PARCIAL = os.environ.get('APSCONT_PARCIAL', '') not in ('', '0')
+BLOCO_REMOTO = 1024 ** 2
+BLOCO_DOWNLOAD = 1024 ** 2
+TENTATIVAS_RETOMADA = 3
+
+
+# Sessão única com keep-alive e novas tentativas com backoff exponencial,
+# compartilhada pelas threads de download.
+def criar_sessao(conexoes=DOWNLOADS_SIMULTANEOS, tentativas=5, backoff=0.5):
+    sessao = requests.Session()
+    retry = Retry(total=tentativas, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset({'GET', 'HEAD'}))
+    adaptador = HTTPAdapter(pool_connections=conexoes, pool_maxsize=conexoes, max_retries=retry)
+    sessao.mount('http://', adaptador)
+    sessao.mount('https://', adaptador)
+    return sessao
+
+
+SESSAO = criar_sessao()
+
+
+# Trava entre processos (workers paralelos usando o mesmo cache) num arquivo
+# de trava; flock também separa threads, já que cada uma abre o arquivo.
+@contextlib.contextmanager
+def _trava_arquivo(caminho):
+    if fcntl is None:
+        yield
+        return
+    with open(caminho, 'a+b') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class CacheArquivos:
+    def __init__(self, diretorio=CACHE_DIR, limite_bytes=CACHE_LIMITE_BYTES, offline=MODO_OFFLINE, sessao=None):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self.offline = offline
+        self.sessao = sessao
+        self._trava = threading.Lock()
+        self.dir_objetos = os.path.join(diretorio, 'objetos')
+        self.dir_travas = os.path.join(diretorio, 'travas')
+        self.arquivo_indice = os.path.join(diretorio, 'indice.json')
+        os.makedirs(self.dir_objetos, exist_ok=True)
+        os.makedirs(self.dir_travas, exist_ok=True)
+
+    # leitura-alteração-gravação do indice.json, exclusiva entre threads e
+    # processos
+    @contextlib.contextmanager
+    def _indice_travado(self):
+        with self._trava, _trava_arquivo(os.path.join(self.dir_travas, 'indice.lock')):
+            yield
+
+    def _ler_indice(self):
+        try:
+            with open(self.arquivo_indice, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _gravar_indice(self, indice):
+        fd, tmp = tempfile.mkstemp(dir=self.diretorio, suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(indice, f)
+        os.replace(tmp, self.arquivo_indice)
+
+    def _caminho_objeto(self, sha256):
+        return os.path.join(self.dir_objetos, f'{sha256}.zip')
+
+    def _valida(self, entrada):
+        return entrada is not None and os.path.exists(self._caminho_objeto(entrada['sha256']))
+
+    def contem(self, url):
+        with self._trava:
+            return self._valida(self._ler_indice().get(url))
+
+    def caminho(self, url, revalidar=True):
+        with self._trava:
+            entrada = self._ler_indice().get(url)
+        if not self._valida(entrada):
+            entrada = None
+
+        if self.offline or (entrada is not None and not revalidar):
+            if entrada is None:
+                raise FileNotFoundError(f'{url} não está no cache e o modo offline está ativo')
+            return self._registrar_acesso(url, entrada)
+
+        # um download por URL de cada vez, entre threads e processos: o .part
+        # e a troca para objetos/ são de quem tem a trava. Quem esperou relê
+        # o índice e, com a cópia que o outro acabou de gravar, só revalida.
+        with _trava_arquivo(os.path.join(self.dir_travas, hashlib.sha256(url.encode()).hexdigest() + '.lock')):
+            with self._trava:
+                entrada = self._ler_indice().get(url)
+            if not self._valida(entrada):
+                entrada = None
+            return self._atualizar(url, entrada)
+
+    def _atualizar(self, url, entrada):
+        try:
+            r = self._baixar(url, entrada)
+        except requests.RequestException:
+            # sem rede: a cópia em cache, mesmo que não revalidada, é melhor que nada
+            if entrada is None:
+                raise
+            return self._registrar_acesso(url, entrada)
+        if r is None:
+            return self._registrar_acesso(url, entrada)
+
+        parcial, meta_parcial = self._parciais(url)
+        meta = self._ler_json(meta_parcial)
+        sha256 = hashlib.sha256()
+        with open(parcial, 'rb') as f:
+            for pedaco in iter(lambda: f.read(BLOCO_DOWNLOAD), b''):
+                sha256.update(pedaco)
+        sha256 = sha256.hexdigest()
+        tamanho = os.path.getsize(parcial)
+        destino = self._caminho_objeto(sha256)
+        if os.path.exists(destino):
+            os.remove(parcial)
+        else:
+            os.replace(parcial, destino)
+        os.remove(meta_parcial)
+
+        entrada = {
+            'sha256': sha256,
+            'tamanho': tamanho,
+            'etag': meta.get('etag'),
+            'last_modified': meta.get('last_modified'),
+        }
+        return self._registrar_acesso(url, entrada)
+
+    def _parciais(self, url):
+        base = os.path.join(self.dir_objetos, hashlib.sha256(url.encode()).hexdigest())
+        return base + '.part', base + '.part.json'
+
+    def _ler_json(self, caminho):
+        try:
+            with open(caminho, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    # Grava o corpo da resposta em <hash da url>.part, em blocos, sem nunca
+    # manter o arquivo inteiro em memória. Se um .part de uma tentativa
+    # anterior existir, pede só o restante (Range + If-Range); se o servidor
+    # mandar o arquivo inteiro de novo, recomeça do zero; um 416 com o
+    # tamanho do .part já é o arquivo completo. Devolve None quando a cópia
+    # em cache continua válida (304).
+    def _baixar(self, url, entrada):
+        sessao = self.sessao or SESSAO
+        parcial, meta_parcial = self._parciais(url)
+        for tentativa in range(TENTATIVAS_RETOMADA):
+            feito = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+            meta = self._ler_json(meta_parcial) if feito else {}
+            validador = meta.get('etag') or meta.get('last_modified')
+            headers = {}
+            if feito and validador:
+                headers['Range'] = f'bytes={feito}-'
+                headers['If-Range'] = validador
+            elif entrada is not None:
+                if entrada.get('etag'):
+                    headers['If-None-Match'] = entrada['etag']
+                if entrada.get('last_modified'):
+                    headers['If-Modified-Since'] = entrada['last_modified']
+
+            recebido = 0
+            try:
+                with sessao.get(url, headers=headers, timeout=TIMEOUT, stream=True) as r:
+                    if r.status_code == 304 and entrada is not None:
+                        return None
+                    if r.status_code == 416:
+                        # o .part já tinha o corpo inteiro (a queda foi depois
+                        # do último bloco) ou não corresponde mais ao arquivo
+                        if r.headers.get('Content-Range', '').rpartition('/')[2] == str(feito):
+                            return r
+                        os.remove(parcial)
+                        os.remove(meta_parcial)
+                        return self._baixar(url, entrada)
+                    r.raise_for_status()
+                    if r.status_code != 206:
+                        meta = {'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified')}
+                        with open(meta_parcial, 'w', encoding='utf-8') as f:
+                            json.dump(meta, f)
+                    with open(parcial, 'ab' if r.status_code == 206 else 'wb') as f:
+                        for pedaco in r.iter_content(BLOCO_DOWNLOAD):
+                            f.write(pedaco)
+                            recebido += len(pedaco)
+                return r
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                # só vale insistir se a conexão caiu no meio do corpo; o .part
+                # fica no disco e a próxima volta continua de onde parou
+                if recebido == 0 or tentativa == TENTATIVAS_RETOMADA - 1:
+                    raise
+
+    def _registrar_acesso(self, url, entrada):
+        # relê o índice sob a trava: outras threads e processos podem ter
+        # gravado entradas enquanto este download acontecia
+        with self._indice_travado():
+            indice = self._ler_indice()
+            entrada['ultimo_acesso'] = time.time()
+            indice[url] = entrada
+            self._despejar(indice, manter=url)
+            self._gravar_indice(indice)
+            return self._caminho_objeto(entrada['sha256'])
+
+    def _despejar(self, indice, manter=None):
+        # LRU: remove as URLs menos usadas até caber no limite; um objeto só é
+        # apagado quando nenhuma outra URL aponta para o mesmo conteúdo
+        tamanhos = {e['sha256']: e['tamanho'] for e in indice.values()}
+        total = sum(tamanhos.values())
+        candidatos = sorted((e['ultimo_acesso'], url) for url, e in indice.items() if url != manter)
+        for _, url in candidatos:
+            if total <= self.limite_bytes:
+                break
+            sha256 = indice.pop(url)['sha256']
+            if all(e['sha256'] != sha256 for e in indice.values()):
+                total -= tamanhos[sha256]
+                try:
+                    os.remove(self._caminho_objeto(sha256))
+                except FileNotFoundError:
+                    pass
+
+    def limpar(self):
+        with self._indice_travado():
+            for nome in os.listdir(self.dir_objetos):
+                os.remove(os.path.join(self.dir_objetos, nome))
+            self._gravar_indice({})
+
+
+CACHE = CacheArquivos()
+
+
+def baixar_arquivo(url, revalidar=True):
+    return CACHE.caminho(url, revalidar=revalidar)
+
+
+# ZIP local mapeado em memória: o sistema operacional traz do disco só as
+# páginas dos membros lidos, e elas podem ser descartadas sob pressão.
+class ArquivoMapeado(io.RawIOBase):
+    def __init__(self, caminho):
+        self.name = caminho
+        with open(caminho, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._mm.tell()
+
+    def seek(self, deslocamento, whence=io.SEEK_SET):
+        self._mm.seek(deslocamento, whence)
+        return self._mm.tell()
+
+    def read(self, n=-1):
+        return self._mm.read(None if n is None or n < 0 else n)
+
+    def readinto(self, destino):
+        dados = self._mm.read(len(destino))
+        destino[:len(dados)] = dados
+        return len(dados)
+
+    def close(self):
+        if not self.closed:
+            self._mm.close()
+        super().close()
+
+
+class RangeNaoSuportado(Exception):
+    pass
+
+
+# Arquivo somente leitura sobre HTTP Range: o ZipFile busca o diretório
+# central no fim do arquivo e depois só os bytes do membro aberto. Os blocos
+# lidos ficam num LRU pequeno para as leituras picadas do zipfile.
+class ZipRemoto(io.RawIOBase):
+    def __init__(self, url, sessao=None, tamanho_bloco=BLOCO_REMOTO, blocos_em_memoria=8):
+        self.url = self.name = url
+        self.sessao = sessao or SESSAO
+        self.tamanho_bloco = tamanho_bloco
+        self.blocos_em_memoria = blocos_em_memoria
+        self.bytes_baixados = 0
+        self._blocos = OrderedDict()
+        self._pos = 0
+        r = self.sessao.get(url, headers={'Range': 'bytes=0-0'}, timeout=TIMEOUT, stream=True)
+        r.close()
+        faixa = r.headers.get('Content-Range', '')
+        if r.status_code != 206 or '/' not in faixa or faixa.endswith('/*'):
+            raise RangeNaoSuportado(url)
+        self.tamanho = int(faixa.rsplit('/', 1)[1])
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, deslocamento, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = deslocamento
+        elif whence == io.SEEK_CUR:
+            self._pos += deslocamento
+        elif whence == io.SEEK_END:
+            self._pos = self.tamanho + deslocamento
+        return self._pos
+
+    def _bloco(self, indice):
+        bloco = self._blocos.get(indice)
+        if bloco is None:
+            inicio = indice * self.tamanho_bloco
+            fim = min(inicio + self.tamanho_bloco, self.tamanho) - 1
+            r = self.sessao.get(self.url, headers={'Range': f'bytes={inicio}-{fim}'}, timeout=TIMEOUT)
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise RangeNaoSuportado(self.url)
+            bloco = self._blocos[indice] = r.content
+            self.bytes_baixados += len(bloco)
+            if len(self._blocos) > self.blocos_em_memoria:
+                self._blocos.popitem(last=False)
+        else:
+            self._blocos.move_to_end(indice)
+        return bloco
+
+    def readinto(self, destino):
+        n = max(0, min(len(destino), self.tamanho - self._pos))
+        lidos = 0
+        while lidos < n:
+            indice, deslocamento = divmod(self._pos, self.tamanho_bloco)
+            pedaco = self._bloco(indice)[deslocamento:deslocamento + n - lidos]
+            destino[lidos:lidos + len(pedaco)] = pedaco
+            lidos += len(pedaco)
+            self._pos += len(pedaco)
+        return lidos
+
+
+BASE_CVM = 'http://dados.cvm.gov.br/dados/CIA_ABERTA/DOC'
+MODELO_CVM = '{base}/{tipo_periodo}/DADOS/{tipo_min}_cia_aberta_{ano}.zip'
+
+
+def nome_arquivo(ano, tipo_periodo):
+    return f'{tipo_periodo.lower()}_cia_aberta_{ano}.zip'
+
+
+def nome_membro(ano, cod, tipo_periodo, tipo_demonstrativo):
+    return f'{tipo_periodo.lower()}_cia_aberta_{cod}_{tipo_demonstrativo}_{ano}.csv'
+
+
+# Fontes de dados: cada uma sabe abrir o ZIP de (ano, tipo_periodo) como um
+# arquivo binário com seek, que o RegistroArquivos entrega ao ZipFile.
+
+# Portal da CVM (ou qualquer espelho HTTP com o mesmo layout), passando pelo
+# cache em disco; no modo parcial, arquivos ainda fora do cache são lidos por
+# HTTP Range e, se o servidor não aceitar Range, baixados inteiros. Quem vai
+# ler todos os membros (a ingestão no armazém) pede inteiro=True: o arquivo
+# vem de uma vez e fica no cache para as próximas atualizações.
+class FonteHTTP:
+    def __init__(self, base=BASE_CVM, modelo=MODELO_CVM, cache=None, parcial=MODO_PARCIAL):
+        self.base = base.rstrip('/')
+        self.modelo = modelo
+        self.cache = cache
+        self.parcial = parcial
+
+    def url(self, ano, tipo_periodo):
+        return self.modelo.format(base=self.base, tipo_periodo=tipo_periodo.upper(),
+                                  tipo_min=tipo_periodo.lower(), ano=ano)
+
+    def abrir_url(self, url, inteiro=False):
+        cache = self.cache or CACHE
+        if self.parcial and not inteiro and not cache.offline and not cache.contem(url):
+            try:
+                return ZipRemoto(url, sessao=cache.sessao)
+            except RangeNaoSuportado:
+                pass
+        return ArquivoMapeado(cache.caminho(url))
+
+    def abrir(self, ano, tipo_periodo, inteiro=False):
+        return self.abrir_url(self.url(ano, tipo_periodo), inteiro)
+
+
+# Espelho local (NFS, disco, pasta sincronizada): aceita tanto o layout do
+# portal (<dir>/DFP/DADOS/dfp_cia_aberta_2020.zip) quanto os ZIPs soltos.
+class FonteDiretorio:
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+
+    def caminho(self, ano, tipo_periodo):
+        nome = nome_arquivo(ano, tipo_periodo)
+        for caminho in (os.path.join(self.diretorio, tipo_periodo.upper(), 'DADOS', nome),
+                        os.path.join(self.diretorio, nome)):
+            if os.path.exists(caminho):
+                return caminho
+        raise FileNotFoundError(f'{nome} não encontrado em {self.diretorio}')
+
+    def abrir(self, ano, tipo_periodo, inteiro=False):
+        return ArquivoMapeado(self.caminho(ano, tipo_periodo))
+
+
+# ZIPs em memória, para testes e benchmarks sem rede nem disco:
+# {('DFP', 2020): <bytes do zip>}.
+class FonteMemoria:
+    def __init__(self, arquivos=None):
+        self.arquivos = {}
+        for (tipo_periodo, ano), conteudo in (arquivos or {}).items():
+            self.adicionar(ano, tipo_periodo, conteudo)
+
+    def adicionar(self, ano, tipo_periodo, conteudo):
+        self.arquivos[(tipo_periodo.upper(), int(ano))] = conteudo
+
+    def abrir(self, ano, tipo_periodo, inteiro=False):
+        try:
+            return io.BytesIO(self.arquivos[(tipo_periodo.upper(), int(ano))])
+        except KeyError:
+            raise FileNotFoundError(nome_arquivo(ano, tipo_periodo)) from None
+
+
+def fonte_de_config(valor):
+    if not isinstance(valor, str):
+        return valor
+    if valor.startswith(('http://', 'https://')):
+        return FonteHTTP(valor)
+    if valor.startswith('file://'):
+        return FonteDiretorio(url2pathname(urlparse(valor).path))
+    return FonteDiretorio(valor)
+
+
+# APSCONT_FONTE escolhe a fonte: URL base HTTP, file:// ou caminho de um espelho.
+FONTE = fonte_de_config(os.environ.get('APSCONT_FONTE', BASE_CVM))
+
+
+def configurar_fonte(valor):
+    global FONTE
+    FONTE = fonte_de_config(valor)
+    return FONTE
+
+
+def abrir_url(url):
+    if url.startswith('file://'):
+        return ArquivoMapeado(url2pathname(urlparse(url).path))
+    if url.startswith(('http://', 'https://')):
+        fonte = FONTE if isinstance(FONTE, FonteHTTP) else FonteHTTP()
+        return fonte.abrir_url(url)
+    return ArquivoMapeado(url)
+
+
+# Um ZipFile aberto por (tipo_periodo, ano) durante a execução: BPA, BPP, DRE,
+# DFC_MI (con e ind) saem todos do mesmo arquivo, aberto uma única vez a
+# partir da fonte configurada.
+class RegistroArquivos:
+    def __init__(self, fonte=None):
+        self.fonte = fonte
+        self._arquivos = {}
+        self._origens = {}
+        self._travas = {}
+        self._trava = threading.Lock()
+
+    def _abrir(self, chave, abrir_origem):
+        # trava por chave: anos diferentes abrem em paralelo, o mesmo ano só uma vez
+        with self._trava:
+            trava = self._travas.setdefault(chave, threading.Lock())
+        with trava:
+            zf = self._arquivos.get(chave)
+            if zf is None:
+                origem = self._origens[chave] = abrir_origem()
+                zf = self._arquivos[chave] = ZipFile(origem)
+            return zf
+
+    def arquivo_url(self, url):
+        return self._abrir(url, lambda: abrir_url(url))
+
+    # inteiro só vale na primeira abertura do ano; depois o ZipFile é reusado
+    def arquivo(self, ano, tipo_periodo, inteiro=False):
+        fonte = self.fonte or FONTE
+        return self._abrir((tipo_periodo.upper(), int(ano)), lambda: fonte.abrir(ano, tipo_periodo, inteiro=inteiro))
+
+    def pre_carregar(self, anos, tipo_periodo, max_workers=DOWNLOADS_SIMULTANEOS, inteiro=False):
+        anos = list(anos)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda ano: self.arquivo(ano, tipo_periodo, inteiro), anos))
+
+    def membros(self, ano, tipo_periodo):
+        return self.arquivo(ano, tipo_periodo).namelist()
+
+    def abrir(self, ano, cod, tipo_periodo, tipo_demonstrativo):
+        return self.arquivo(ano, tipo_periodo).open(nome_membro(ano, cod, tipo_periodo, tipo_demonstrativo))
+
+    def fechar(self):
+        with self._trava:
+            for zf in self._arquivos.values():
+                zf.close()
+            for origem in self._origens.values():
+                origem.close()
+            self._arquivos.clear()
+            self._origens.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+REGISTRO = RegistroArquivos()
+
+
+# Esquema dos CSVs de demonstrativos da CVM: códigos como texto (preserva os
+# zeros à esquerda de CD_CVM e o '2.01.02' de CD_CONTA), VL_CONTA numérico e
+# datas convertidas bloco a bloco.
+ESQUEMA = {
+    'CNPJ_CIA': str,
+    'VERSAO': 'Int64',
+    'DENOM_CIA': str,
+    'CD_CVM': str,
+    'GRUPO_DFP': str,
+    'MOEDA': str,
+    'ESCALA_MOEDA': str,
+    'ORDEM_EXERC': str,
+    'CD_CONTA': str,
+    'DS_CONTA': str,
+    'VL_CONTA': 'float64',
+    'ST_CONTA_FIXA': str,
+    'COLUNA_DF': str,
+}
+COLUNAS_DATA = ('DT_REFER', 'DT_INI_EXERC', 'DT_FIM_EXERC')
+TAMANHO_BLOCO = 200_000
+
+# Esquema compacto em memória, aplicado depois da leitura: textos repetidos
+# viram categorias (códigos inteiros + um dicionário por coluna), ORDEM_EXERC
+# vira inteiro pequeno e VERSAO cabe em 16 bits.
+CATEGORICAS = ('CNPJ_CIA', 'DENOM_CIA', 'CD_CVM', 'GRUPO_DFP', 'MOEDA', 'ESCALA_MOEDA',
+               'CD_CONTA', 'DS_CONTA', 'ST_CONTA_FIXA', 'COLUNA_DF')
+ORDEM_EXERC = {'ÚLTIMO': 0, 'PENÚLTIMO': 1}
+
+
+def aplicar_esquema(df):
+    for coluna in CATEGORICAS:
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype('category')
+    if 'ORDEM_EXERC' in df.columns and not pd.api.types.is_integer_dtype(df['ORDEM_EXERC']):
+        df['ORDEM_EXERC'] = df['ORDEM_EXERC'].map(ORDEM_EXERC).astype('Int8')
+    if 'VERSAO' in df.columns:
+        df['VERSAO'] = df['VERSAO'].astype('Int16')
+    if 'VL_CONTA' in df.columns:
+        df['VL_CONTA'] = df['VL_CONTA'].astype('float64')
+    return df
+
+
+# Reapresentações: a CVM mantém no arquivo as versões antigas de um mesmo
+# demonstrativo. A versão vale para a entrega inteira, (CD_CVM, DT_REFER):
+# fica a maior VERSAO de cada entrega com todas as suas linhas, e as linhas
+# das versões antigas saem, inclusive as de contas que a reapresentação
+# tirou ou renumerou. Numa passada de groupby no arquivo todo.
+CHAVE_VERSAO = ('CD_CVM', 'DT_REFER')
+
+
+def manter_ultima_versao(df):
+    if df.empty or any(c not in df.columns for c in CHAVE_VERSAO + ('VERSAO',)):
+        return df
+    maior = df.groupby(list(CHAVE_VERSAO), observed=True, sort=False, dropna=False)['VERSAO'].transform('max')
+    manter = (df['VERSAO'] == maior).fillna(True).astype(bool)
+    if manter.all():
+        return df
+    return df[manter].reset_index(drop=True)
+
+
+def codigos_ordem(valores):
+    return {ORDEM_EXERC.get(v, v) for v in valores}
+
+
+# Normalização de VL_CONTA: o formato numérico é detectado uma vez por arquivo
+# numa amostra do começo do membro. O formato que a CVM publica ('decimal',
+# 1234.5600000000) é lido como float direto pelo parser; os outros chegam como
+# texto e são convertidos numa única passada de str.translate + to_numeric.
+AMOSTRA_FORMATO = 64 * 1024
+_TRADUCOES = {
+    'parenteses': str.maketrans({'(': '-', ')': None, ' ': None}),
+    'virgula': str.maketrans({'.': None, ',': '.', '(': '-', ')': None, ' ': None}),
+}
+
+
+def detectar_formato(amostra, sep=';'):
+    linhas = amostra.decode('ISO-8859-1').splitlines()
+    if not linhas or 'VL_CONTA' not in linhas[0].split(sep):
+        return 'decimal'
+    indice = linhas[0].split(sep).index('VL_CONTA')
+    if len(amostra) >= AMOSTRA_FORMATO:
+        linhas = linhas[:-1]  # a última linha da amostra pode estar cortada
+    valores = [campos[indice] for campos in (l.split(sep) for l in linhas[1:]) if len(campos) > indice]
+    if any(',' in v for v in valores):
+        return 'virgula'
+    if any('(' in v or ' ' in v.strip() for v in valores):
+        return 'parenteses'
+    return 'decimal'
+
+
+# 'misto' é para o arquivo que muda de formato no meio: cada valor com
+# vírgula é lido como decimal com vírgula, os outros como ponto decimal
+def normalizar_vl_conta(serie, formato):
+    if formato == 'misto':
+        texto = serie.astype(str)
+        virgula = texto.str.contains(',', regex=False)
+        serie = texto.str.translate(_TRADUCOES['parenteses'])
+        serie[virgula] = texto[virgula].str.translate(_TRADUCOES['virgula'])
+    elif formato != 'decimal':
+        serie = serie.astype(str).str.translate(_TRADUCOES[formato])
+    return pd.to_numeric(serie, errors='coerce').astype('float64')
+
+
+def _como_conjunto(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, (str, int)):
+        return {valor}
+    return set(valor)
+
+
+# Predicados aplicados durante a leitura: só as linhas das companhias, anos
+# (de DT_FIM_EXERC) e ORDEM_EXERC pedidos chegam a ser materializadas.
+def filtrar_bloco(bloco, cd_cvm=None, ano_exercicio=None, ordem_exerc=None):
+    cd_cvm = _como_conjunto(cd_cvm)
+    ordem_exerc = _como_conjunto(ordem_exerc)
+    ano_exercicio = _como_conjunto(ano_exercicio)
+    if cd_cvm is not None:
+        bloco = bloco[bloco['CD_CVM'].isin(cd_cvm)]
+    if ordem_exerc is not None:
+        if pd.api.types.is_integer_dtype(bloco['ORDEM_EXERC']):
+            ordem_exerc = codigos_ordem(ordem_exerc)
+        bloco = bloco[bloco['ORDEM_EXERC'].isin(ordem_exerc)]
+    if ano_exercicio is not None:
+        bloco = bloco[bloco['DT_FIM_EXERC'].dt.year.isin({int(a) for a in ano_exercicio})]
+    return bloco
+
+
+def ler_csv_em_blocos(arquivo, sep=';', usecols=None, tamanho_bloco=TAMANHO_BLOCO,
+                      cd_cvm=None, ano_exercicio=None, ordem_exerc=None, formato=None):
+    # o membro do ZIP é descomprimido e decodificado (ISO-8859-1) aos poucos,
+    # então a memória fica limitada ao bloco e não ao arquivo inteiro
+    if formato is None:
+        arquivo = io.BufferedReader(arquivo, buffer_size=AMOSTRA_FORMATO)
+        formato = detectar_formato(arquivo.peek(AMOSTRA_FORMATO)[:AMOSTRA_FORMATO], sep)
+    esquema = ESQUEMA if formato == 'decimal' else dict(ESQUEMA, VL_CONTA=str)
+    filtros = {'cd_cvm': cd_cvm, 'ano_exercicio': ano_exercicio, 'ordem_exerc': ordem_exerc}
+    colunas_filtro = {'cd_cvm': 'CD_CVM', 'ano_exercicio': 'DT_FIM_EXERC', 'ordem_exerc': 'ORDEM_EXERC'}
+    descartar = []
+    if usecols is not None:
+        usecols = set(usecols)
+        for nome, valor in filtros.items():
+            if valor is not None and colunas_filtro[nome] not in usecols:
+                usecols.add(colunas_filtro[nome])
+                descartar.append(colunas_filtro[nome])
+
+    def abrir_leitor(esquema):
+        return pd.read_csv(
+            arquivo,
+            sep=sep,
+            encoding='ISO-8859-1',
+            dtype=esquema,
+            usecols=None if usecols is None else (lambda c: c in usecols),
+            quoting=csv.QUOTE_NONE,
+            chunksize=tamanho_bloco,
+        )
+
+    leitor = abrir_leitor(esquema)
+    entregues = 0
+    try:
+        while True:
+            try:
+                bloco = next(leitor)
+            except StopIteration:
+                break
+            except ValueError:
+                # valor fora do formato da amostra depois dos primeiros 64 KB:
+                # relê do começo com VL_CONTA como texto, convertido valor a
+                # valor, e pula os blocos já entregues
+                if formato != 'decimal' or not arquivo.seekable():
+                    raise
+                leitor.close()
+                arquivo.seek(0)
+                formato = 'misto'
+                leitor = abrir_leitor(dict(ESQUEMA, VL_CONTA=str))
+                for _ in range(entregues):
+                    next(leitor)
+                continue
+            entregues += 1
+            # filtra pelos códigos antes de converter datas, que é a parte cara
+            bloco = filtrar_bloco(bloco, cd_cvm=cd_cvm, ordem_exerc=ordem_exerc)
+            for coluna in COLUNAS_DATA:
+                if coluna in bloco.columns:
+                    bloco[coluna] = pd.to_datetime(bloco[coluna], format='%Y-%m-%d', errors='coerce')
+            bloco = filtrar_bloco(bloco, ano_exercicio=ano_exercicio)
+            if formato != 'decimal' and 'VL_CONTA' in bloco.columns:
+                bloco['VL_CONTA'] = normalizar_vl_conta(bloco['VL_CONTA'], formato)
+            if descartar:
+                bloco = bloco.drop(columns=descartar)
+            yield bloco
+    finally:
+        leitor.close()
+
+
+# com usecols, a chave da entrega e a VERSAO são lidas para a deduplicação
+# e descartadas depois
+def ler_csv(arquivo, sep=';', usecols=None, tamanho_bloco=TAMANHO_BLOCO, deduplicar=True, **filtros):
+    extras = []
+    if deduplicar and usecols is not None:
+        extras = [c for c in CHAVE_VERSAO + ('VERSAO',) if c not in usecols]
+        usecols = list(usecols) + extras
+    try:
+        blocos = list(ler_csv_em_blocos(arquivo, sep, usecols, tamanho_bloco, **filtros))
+    finally:
+        arquivo.close()
+    df = aplicar_esquema(blocos[0] if len(blocos) == 1 else pd.concat(blocos, ignore_index=True))
+    if not deduplicar:
+        return df
+    return manter_ultima_versao(df).drop(columns=extras, errors='ignore')
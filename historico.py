@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from cvm_armazem import armazem_disponivel
+from indicadores import Plano
+from pipeline import obter_pipeline
+
+# Série persistida por companhia e ano: os saldos das contas do plano (entre
+# eles os de fechamento que as médias usam: patrimônio líquido, estoques,
+# recebíveis, fornecedores, ativo total e empréstimos) e os indicadores já
+# calculados. Quando sai um DFP novo, anexar(ano) lê só esse ano e usa os
+# saldos guardados do ano anterior, em vez de recalcular a série inteira.
+#   <HISTORICO_DIR>/DFP_con/017450/<plano>/{saldos,indicadores}.parquet
+HISTORICO_DIR = os.environ.get('APSCONT_HISTORICO',
+                               os.path.join(os.path.expanduser('~'), '.cache', 'apscont', 'historico'))
+
+
+def _nome_companhias(cd_cvm):
+    if cd_cvm is None:
+        return 'mercado'
+    if isinstance(cd_cvm, str):
+        return cd_cvm
+    return 'grupo-' + hashlib.sha1(','.join(sorted(cd_cvm)).encode()).hexdigest()[:12]
+
+
+class Historico:
+    def __init__(self, nomes, cd_cvm, diretorio=None, tipo_periodo='DFP', tipo_demonstrativo='con'):
+        self.plano = Plano(nomes)
+        self.cd_cvm = cd_cvm
+        self.tipo_periodo = tipo_periodo
+        self.tipo_demonstrativo = tipo_demonstrativo
+        assinatura = hashlib.sha1('\n'.join(self.plano.nomes).encode()).hexdigest()[:12]
+        self.diretorio = os.path.join(diretorio or HISTORICO_DIR, f'{tipo_periodo.upper()}_{tipo_demonstrativo}',
+                                      _nome_companhias(cd_cvm), assinatura)
+
+    def _caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
+    def existe(self):
+        return os.path.exists(self._caminho('indicadores.parquet'))
+
+    def ler(self):
+        return pd.read_parquet(self._caminho('indicadores.parquet'))
+
+    def ler_saldos(self):
+        return pd.read_parquet(self._caminho('saldos.parquet'))
+
+    def _gravar(self, saldos, indicadores):
+        if not armazem_disponivel():
+            raise ImportError('o histórico precisa do pyarrow (pip install pyarrow)')
+        os.makedirs(self.diretorio, exist_ok=True)
+        for nome, df in (('saldos.parquet', saldos), ('indicadores.parquet', indicadores)):
+            df.sort_index().to_parquet(self._caminho(nome) + '.tmp')
+            os.replace(self._caminho(nome) + '.tmp', self._caminho(nome))
+        with open(self._caminho('plano.json'), 'w', encoding='utf-8') as f:
+            json.dump({'indicadores': self.plano.nomes, 'contas': sorted(self.plano.contas)}, f)
+
+    # série completa, do zero
+    def calcular(self, anos):
+        anos = [int(a) for a in anos]
+        saldos = obter_pipeline(self.cd_cvm, anos, self.tipo_periodo, self.tipo_demonstrativo).saldos(self.plano, anos)
+        indicadores = self.plano.avaliar_painel(saldos)
+        indicadores = indicadores[indicadores.index.get_level_values('Ano').isin(anos)]
+        self._gravar(saldos, indicadores)
+        return indicadores
+
+    # Acrescenta (ou refaz) um ano: carrega só os demonstrativos desse ano e
+    # tira o ano anterior dos saldos guardados.
+    def anexar(self, ano):
+        ano = int(ano)
+        if not self.existe():
+            raise FileNotFoundError(f'nenhuma série em {self.diretorio}; use calcular(anos) primeiro')
+        saldos = self.ler_saldos()
+        faltando = self.plano.contas - set(saldos.columns)
+        if faltando:
+            raise ValueError(f'saldos guardados sem as contas {sorted(faltando)}; recalcule a série')
+        novos = obter_pipeline(self.cd_cvm, [ano], self.tipo_periodo, self.tipo_demonstrativo).saldos(
+            self.plano, [ano], com_anterior=False)
+        novos_indicadores = self.plano.avaliar_painel(novos, saldos)
+
+        indicadores = self.ler()
+        saldos = pd.concat([saldos[saldos.index.get_level_values('Ano') != ano], novos])
+        indicadores = pd.concat([indicadores[indicadores.index.get_level_values('Ano') != ano], novos_indicadores])
+        self._gravar(saldos, indicadores)
+        return indicadores.sort_index()
@@ -0,0 +1,331 @@
+import ast
+
+import numpy as np
+import pandas as pd
+
+
+# Conta de um demonstrativo, pelo código CVM (somando vários códigos quando
+# a mesma linha aparece em mais de um grupo) ou, para linhas sem código
+# padronizado, pelo termo (ou algum dos termos) contido na descrição.
+class Conta:
+    def __init__(self, demonstrativo, *codigos, contendo=None):
+        self.demonstrativo = demonstrativo
+        self.codigos = codigos
+        self.contendo = contendo
+
+    def valor(self, indice):
+        if self.contendo is not None:
+            termos = (self.contendo,) if isinstance(self.contendo, str) else self.contendo
+            return indice.contendo(*termos)
+        return indice.codigo(*self.codigos)
+
+
+CONTAS = {
+    'ativo_total': Conta('BPA', '1'),
+    'ativo_circulante': Conta('BPA', '1.01'),
+    'caixa': Conta('BPA', '1.01.01'),
+    'contas_a_receber': Conta('BPA', '1.01.03'),
+    'estoques': Conta('BPA', '1.01.04'),
+    'passivo_total': Conta('BPP', '2'),
+    'passivo_circulante': Conta('BPP', '2.01'),
+    'fornecedores': Conta('BPP', '2.01.02'),
+    'passivo_nao_circulante': Conta('BPP', '2.02'),
+    'emprestimos': Conta('BPP', '2.01.04', '2.02.01'),
+    'patrimonio_liquido': Conta('BPP', '2.03'),
+    'receita': Conta('DRE', '3.01'),
+    'custo_vendas': Conta('DRE', '3.02'),
+    'despesas_operacionais': Conta('DRE', '3.04'),
+    'despesas_financeiras': Conta('DRE', '3.06.02'),
+    'lucro_liquido': Conta('DRE', '3.11'),
+    'depreciacao': Conta('DRE', contendo='Depreciação'),
+    'caixa_operacional': Conta('DFC_MI', '6.01'),
+    # investimentos em imobilizado e intangível ficam em linhas livres de 6.02
+    'aquisicoes_imobilizado': Conta('DFC_MI', contendo=(
+        'Aquisição de Imobilizado', 'Aquisições de Imobilizado', 'Aquisição do Imobilizado',
+        'Aquisições do Imobilizado', 'Aquisição de Ativo Imobilizado', 'Aquisições de Ativo Imobilizado',
+        'Adições ao Imobilizado', 'Aquisição de Intangível', 'Aquisições de Intangível',
+        'Aquisição do Intangível', 'Aquisições do Intangível', 'Adições ao Intangível')),
+}
+
+
+# Indicador declarado como expressão sobre contas e outros indicadores.
+# medio(conta) é a média entre o saldo do ano e o do ano anterior (só o do
+# ano quando não há anterior); variacao(conta) é o saldo menos o anterior
+# (zero sem anterior). casas arredonda só a saída, nunca os intermediários.
+class Indicador:
+    def __init__(self, expressao, casas=None, rotulo=None):
+        self.expressao = expressao
+        self.casas = casas
+        self.rotulo = rotulo
+
+
+INDICADORES = {
+    # liquidez
+    'liquidez_corrente': Indicador('ativo_circulante / passivo_circulante', 1),
+    'liquidez_imediata': Indicador('caixa / passivo_circulante', 1),
+    'liquidez_seca': Indicador('(ativo_circulante - estoques) / passivo_circulante', 1),
+    # EBIT e EBITDA
+    'EBIT': Indicador('receita + custo_vendas + despesas_operacionais', 2),
+    'EBITDA': Indicador('EBIT - depreciacao', 2),
+    # estrutura de capital
+    'capital_proprio': Indicador('patrimonio_liquido'),
+    'capital_terceiros': Indicador('passivo_circulante + passivo_nao_circulante'),
+    'Composição_do_capital_proprio': Indicador('capital_proprio / passivo_total * 100', 0),
+    'Composição_do_capital_de_terceiros': Indicador('capital_terceiros / passivo_total * 100', 0),
+    'divida_liquida_sobre_EBITDA': Indicador('(emprestimos - caixa) / EBITDA', 1),
+    'indice_cobertura_juros': Indicador('EBIT / abs(despesas_financeiras)', 1),
+    'endividamento': Indicador('capital_terceiros / ativo_total * 100', 0),
+    'Perfil_da_divida': Indicador('passivo_circulante / capital_terceiros * 100', 0),
+    # rentabilidade
+    'ROE': Indicador('lucro_liquido / medio(patrimonio_liquido) * 100', 0),
+    'Margem_bruta': Indicador('(receita + custo_vendas) / receita * 100', 0),
+    'Margem_EBIT': Indicador('EBIT / receita * 100', 0),
+    'Margem_liquida': Indicador('lucro_liquido / receita * 100', 0),
+    # prazos médios e ciclos
+    'compras': Indicador('variacao(estoques) + abs(custo_vendas)'),
+    'PMRE': Indicador('medio(estoques) / abs(custo_vendas) * 365', 0),
+    'PMRV': Indicador('medio(contas_a_receber) / receita * 365', 0),
+    'PMPF': Indicador('abs(medio(fornecedores) / compras * 365)', 0),
+    'Ciclo_Operacional': Indicador('PMRE + PMRV', 0),
+    'Ciclo_de_Caixa': Indicador('Ciclo_Operacional - PMPF', 0),
+    # fluxo de caixa (DFC método indireto)
+    'fluxo_caixa_operacional': Indicador('caixa_operacional', 2),
+    'capex': Indicador('abs(aquisicoes_imobilizado)', 2),
+    'fluxo_caixa_livre': Indicador('fluxo_caixa_operacional - capex', 2),
+    'conversao_caixa_EBITDA': Indicador('fluxo_caixa_operacional / EBITDA * 100', 0),
+    'rendimento_FCL_capital_proprio': Indicador('fluxo_caixa_livre / capital_proprio * 100', 1),
+    # DuPont tradicional
+    'dupont_t_margem_liquida': Indicador('lucro_liquido / receita * 100', rotulo='Margem Líquida DuPont T'),
+    'dupont_t_giro_do_ativo': Indicador('receita / medio(ativo_total)', rotulo='Giro do Ativo DuPont T'),
+    'dupont_t_roa': Indicador('dupont_t_margem_liquida * dupont_t_giro_do_ativo', rotulo='ROA DuPont T'),
+    'dupont_t_alavancagem': Indicador('medio(ativo_total) / medio(patrimonio_liquido)', rotulo='Alavancagem DuPont T'),
+    'dupont_t_roe': Indicador('dupont_t_roa * dupont_t_alavancagem', rotulo='ROE DuPont T'),
+    # DuPont ajustada (despesa financeira líquida de IR/CS a 34%)
+    'despesas_financeiras_liquidas': Indicador('despesas_financeiras * (1 - 0.34)'),
+    'ativo_liquido_medio': Indicador('medio(patrimonio_liquido) + medio(emprestimos)'),
+    'dupont_a_lucro_do_ativo': Indicador('lucro_liquido - despesas_financeiras_liquidas', rotulo='Lucro do Ativo DuPont A'),
+    'dupont_a_ativo_liquido': Indicador('patrimonio_liquido + emprestimos', rotulo='Ativo Liquido DuPont A'),
+    'dupont_a_margem_liquida': Indicador('dupont_a_lucro_do_ativo / receita * 100', rotulo='Margem Liquida Ajustada DuPont A'),
+    'dupont_a_giro_do_ativo_liquido': Indicador('receita / ativo_liquido_medio', rotulo='Giro do Ativo Liquido DuPont A'),
+    'dupont_a_roic': Indicador('dupont_a_lucro_do_ativo / ativo_liquido_medio * 100', rotulo='ROIC DuPont A'),
+    'dupont_a_kd': Indicador('abs(despesas_financeiras_liquidas / medio(emprestimos) * 100)', rotulo='Custo da Dívida DuPont A'),
+    'dupont_a_spread': Indicador('dupont_a_roic - dupont_a_kd', rotulo='Spread DuPont A'),
+    'dupont_a_alavancagem': Indicador('medio(emprestimos) / medio(patrimonio_liquido) * 100', rotulo='Alavancagem com dívida DuPont A'),
+    'dupont_a_contribuicao': Indicador('dupont_a_spread * dupont_a_alavancagem / 100', rotulo='Contribuição da Alavancagem DuPont A'),
+    'dupont_a_roe': Indicador('dupont_a_roic + dupont_a_contribuicao', rotulo='ROE DuPont A'),
+}
+
+ANALISES = ['liquidez_corrente', 'liquidez_imediata', 'liquidez_seca', 'EBIT', 'EBITDA',
+            'Composição_do_capital_proprio', 'Composição_do_capital_de_terceiros', 'capital_proprio',
+            'capital_terceiros', 'divida_liquida_sobre_EBITDA', 'indice_cobertura_juros', 'endividamento', 'ROE',
+            'Margem_bruta', 'Margem_EBIT', 'Margem_liquida', 'Perfil_da_divida', 'PMRE', 'PMRV', 'PMPF',
+            'Ciclo_Operacional', 'Ciclo_de_Caixa']
+FLUXO_DE_CAIXA = ['fluxo_caixa_operacional', 'capex', 'fluxo_caixa_livre', 'conversao_caixa_EBITDA',
+                  'rendimento_FCL_capital_proprio']
+DUPONT_TRADICIONAL = ['dupont_t_margem_liquida', 'dupont_t_giro_do_ativo', 'dupont_t_roa', 'dupont_t_alavancagem',
+                      'dupont_t_roe']
+DUPONT_AJUSTADA = ['dupont_a_lucro_do_ativo', 'dupont_a_ativo_liquido', 'dupont_a_margem_liquida',
+                   'dupont_a_giro_do_ativo_liquido', 'dupont_a_roic', 'dupont_a_kd', 'dupont_a_spread',
+                   'dupont_a_alavancagem', 'dupont_a_contribuicao', 'dupont_a_roe']
+
+
+def _medio(atual, anterior):
+    return np.where(np.isnan(anterior), atual, (atual + anterior) / 2)
+
+
+def _variacao(atual, anterior):
+    return np.where(np.isnan(anterior), 0.0, atual - anterior)
+
+
+# Divisão mascarada: denominador zero dá NaN (indicador indefinido), tanto
+# onde os scripts davam inf (liquidez, cobertura, ROE, prazos) quanto onde
+# davam 0 (margens e DuPont tradicional); assim um zero não entra como valor
+# nas medianas e percentis dos pares. NaN na entrada continua NaN.
+def _dividir(numerador, denominador):
+    forma = np.broadcast_shapes(np.shape(numerador), np.shape(denominador))
+    return np.divide(numerador, denominador, out=np.full(forma, np.nan), where=np.not_equal(denominador, 0))
+
+
+_DERIVADAS = {'medio': _medio, 'variacao': _variacao}
+
+
+def _derivada(funcao, conta):
+    return f'{funcao}__{conta}'
+
+
+# quantos passos do eixo de períodos separam um período do mesmo período do
+# ano anterior
+_DEFASAGEM = {'Ano': 1, 'Trimestre': 4}
+
+
+# Cubo denso companhia × período × conta a partir de um painel com índice
+# Ano, Trimestre ou (CD_CVM, período), guardado conta a conta para que cada
+# matriz companhia × período seja contígua. Os períodos viram posições
+# consecutivas (anos, ou ordinais dos trimestres), então o anterior de todas
+# as linhas é uma fatia deslocada da mesma matriz; buracos na série ficam
+# NaN. Devolve também a posição (companhia, período) de cada linha.
+def _cubo(saldos, contas):
+    indice = saldos.index
+    nivel = 'Trimestre' if 'Trimestre' in indice.names else 'Ano'
+    if isinstance(indice, pd.MultiIndex):
+        # os códigos do MultiIndex já são a fatoração de cada nível
+        companhias = indice.codes[indice.names.index('CD_CVM')]
+        n_companhias = len(indice.levels[indice.names.index('CD_CVM')])
+        posicao = indice.names.index(nivel)
+        periodos = indice.levels[posicao]
+        codigos = indice.codes[posicao]
+    else:
+        companhias, n_companhias = np.zeros(len(indice), dtype='int64'), 1
+        periodos, codigos = indice, np.arange(len(indice))
+    ordinais = periodos.asi8 if isinstance(periodos, pd.PeriodIndex) else np.asarray(periodos, dtype='int64')
+    inicio = ordinais.min() if len(ordinais) else 0
+    n_periodos = ordinais.max() - inicio + 1 if len(ordinais) else 0
+    posicoes = ordinais[codigos] - inicio
+    cubo = np.full((len(contas), n_companhias, n_periodos), np.nan)
+    cubo[:, companhias, posicoes] = saldos[contas].to_numpy(dtype='float64').T
+    return cubo, _DEFASAGEM[nivel], (companhias, posicoes)
+
+
+def _defasar(matriz, defasagem):
+    anterior = np.full_like(matriz, np.nan)
+    anterior[:, defasagem:] = matriz[:, :-defasagem]
+    return anterior
+
+
+# Troca medio(x) por medio__x (calculada uma vez por avaliação, por mais
+# indicadores que a usem) e a / b por _dividir(a, b), e registra quais
+# contas precisam do saldo do ano anterior.
+class _Compilador(ast.NodeTransformer):
+    def __init__(self, contas):
+        self.contas = contas
+        self.nomes = set()
+        self.anteriores = set()
+        self.derivadas = set()
+
+    def visit_Call(self, no):
+        self.generic_visit(no)
+        if isinstance(no.func, ast.Name) and no.func.id in _DERIVADAS:
+            if len(no.args) != 1 or not isinstance(no.args[0], ast.Name) or no.args[0].id not in self.contas:
+                raise ValueError(f'{no.func.id}() só aceita uma conta, não {ast.unparse(no)}')
+            conta = no.args[0].id
+            self.anteriores.add(conta)
+            self.derivadas.add((no.func.id, conta))
+            return ast.copy_location(ast.Name(_derivada(no.func.id, conta), ast.Load()), no)
+        return no
+
+    def visit_BinOp(self, no):
+        self.generic_visit(no)
+        if isinstance(no.op, ast.Div):
+            return ast.Call(ast.Name('_dividir', ast.Load()), [no.left, no.right], [])
+        return no
+
+    def visit_Name(self, no):
+        if no.id not in _DERIVADAS and no.id != 'abs':
+            self.nomes.add(no.id)
+        return no
+
+
+# Plano de avaliação: resolve as dependências dos indicadores pedidos, compila
+# cada expressão uma vez e junta as contas necessárias, para que cada conta
+# seja lida uma única vez e todos os indicadores saiam de operações sobre
+# colunas inteiras (uma linha por ano, ou por companhia e ano).
+class Plano:
+    def __init__(self, nomes, contas=CONTAS, indicadores=INDICADORES):
+        self.nomes = list(nomes)
+        self.catalogo = contas
+        self.indicadores = indicadores
+        self.ordem = []
+        self.compilados = {}
+        self.contas = set()
+        self.anteriores = set()
+        self.derivadas = set()
+        for nome in self.nomes:
+            self._resolver(nome, ())
+        self.demonstrativos = sorted({contas[c].demonstrativo for c in self.contas})
+
+    def _resolver(self, nome, pilha):
+        if nome in self.compilados or nome in self.contas:
+            return
+        if nome in self.catalogo:
+            self.contas.add(nome)
+            return
+        if nome not in self.indicadores:
+            raise KeyError(f'indicador ou conta desconhecido: {nome}')
+        if nome in pilha:
+            raise ValueError('dependência circular: ' + ' -> '.join(pilha + (nome,)))
+        compilador = _Compilador(self.catalogo)
+        arvore = compilador.visit(ast.parse(self.indicadores[nome].expressao, mode='eval'))
+        for dependencia in sorted(compilador.nomes):
+            self._resolver(dependencia, pilha + (nome,))
+        self.anteriores |= compilador.anteriores
+        self.derivadas |= compilador.derivadas
+        self.compilados[nome] = compile(ast.fix_missing_locations(arvore), nome, 'eval')
+        self.ordem.append(nome)
+
+    # {demonstrativo: anos} mínimo para avaliar o plano nos anos pedidos: o
+    # ano anterior só entra para os demonstrativos com saldo médio ou variação
+    def anos_por_demonstrativo(self, anos):
+        anos = {int(a) for a in anos}
+        anteriores = {a - 1 for a in anos} - anos
+        necessarios = {}
+        for conta in self.contas:
+            cod = self.catalogo[conta].demonstrativo
+            necessarios.setdefault(cod, set()).update(anos)
+            if conta in self.anteriores:
+                necessarios[cod] |= anteriores
+        return {cod: sorted(a) for cod, a in sorted(necessarios.items())}
+
+    # valores das contas do plano a partir de {demonstrativo: PainelContas}
+    def valores(self, indices):
+        return {c: self.catalogo[c].valor(indices[self.catalogo[c].demonstrativo]) for c in sorted(self.contas)}
+
+    # Tabela ano × conta a partir de {demonstrativo: PainelContas}. Conta
+    # ausente de um demonstrativo entregue vale zero (cada painel já sai
+    # alinhado às suas chaves); chave sem o demonstrativo, como quem entrega
+    # a DFC pelo método direto e não a DFC_MI, fica NaN nas contas dele.
+    def painel(self, paineis):
+        return pd.DataFrame(self.valores(paineis))
+
+    # Avalia todos os indicadores sobre arrays de mesma forma, uma matriz
+    # companhia × período por conta.
+    def _calcular(self, contas, anteriores, forma):
+        ambiente = {'abs': np.abs, '_dividir': _dividir}
+        ambiente.update(contas)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for funcao, conta in self.derivadas:
+                ambiente[_derivada(funcao, conta)] = _DERIVADAS[funcao](contas[conta], anteriores[conta])
+            for nome in self.ordem:
+                resultado = eval(self.compilados[nome], {'__builtins__': {}}, ambiente)
+                ambiente[nome] = np.broadcast_to(np.asarray(resultado, dtype='float64'), forma)
+        return ambiente
+
+    # uma coluna por indicador pedido, recolhidas de uma vez do cubo nas
+    # posições (companhia, período) de selecao
+    def _saida(self, ambiente, indice, selecao):
+        valores = np.stack([ambiente[nome] for nome in self.nomes])[(slice(None),) + selecao]
+        colunas = []
+        for k, nome in enumerate(self.nomes):
+            indicador = self.indicadores.get(nome)
+            if indicador is not None and indicador.casas is not None:
+                valores[k] = np.round(valores[k], indicador.casas)
+            colunas.append((indicador.rotulo or nome) if indicador is not None else nome)
+        return pd.DataFrame(valores.T, index=indice, columns=colunas, copy=False)
+
+    # atual indexado por ano ou trimestre (ou por companhia e período): as
+    # contas viram um cubo companhia × período × conta e cada indicador sai
+    # de uma vez para o mercado e a série inteira, com o anterior de cada
+    # linha (ano - 1, ou trimestre - 4, da mesma companhia) numa fatia
+    # deslocada do cubo. historico, se dado, é onde procurar esses períodos
+    # anteriores.
+    def avaliar_painel(self, atual, historico=None):
+        contas = sorted(self.contas)
+        base = atual[contas]
+        if historico is not None:
+            base = pd.concat([historico[contas].drop(atual.index, errors='ignore'), base])
+        cubo, defasagem, (companhias, posicoes) = _cubo(base, contas)
+        matrizes = dict(zip(contas, cubo))
+        anteriores = {c: _defasar(matrizes[c], defasagem) for c in self.anteriores}
+        ambiente = self._calcular(matrizes, anteriores, cubo.shape[1:])
+        # as linhas de atual são as últimas de base
+        linhas = slice(len(base) - len(atual), None)
+        return self._saida(ambiente, atual.index, (companhias[linhas], posicoes[linhas]))
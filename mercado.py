@@ -0,0 +1,28 @@
+import pandas as pd
+
+from indicadores import ANALISES, DUPONT_AJUSTADA, DUPONT_TRADICIONAL, FLUXO_DE_CAIXA, Plano
+from pipeline import obter_pipeline
+
+# Modo mercado: em vez de um script por companhia, cada arquivo anual é lido
+# uma vez com todas as companhias e os indicadores saem agrupados por
+# (CD_CVM, Ano) numa única tabela, uma linha por companhia e ano.
+INDICADORES_MERCADO = ANALISES + FLUXO_DE_CAIXA + DUPONT_TRADICIONAL + DUPONT_AJUSTADA
+
+
+# conferir acrescenta a coluna CONSISTENTE: False quando algum pai da árvore
+# de contas não bate com a soma dos filhos naquele ano.
+def indicadores_mercado(year_range, nomes=INDICADORES_MERCADO, tipo_demonstrativo='con', cd_cvm=None,
+                        conferir=False):
+    if isinstance(cd_cvm, str):
+        cd_cvm = {cd_cvm}
+    pipeline = obter_pipeline(cd_cvm, year_range, 'DFP', tipo_demonstrativo)
+    plano = Plano(nomes)
+    resultado = pipeline.calcular(plano)
+
+    companhias = pd.concat([pipeline.demonstrativo(cod)[['CD_CVM', 'DENOM_CIA']] for cod in plano.demonstrativos],
+                           ignore_index=True)
+    companhias = companhias.astype(str).drop_duplicates('CD_CVM', keep='last').set_index('CD_CVM')['DENOM_CIA']
+    resultado.insert(0, 'DENOM_CIA', companhias.reindex(resultado.index.get_level_values('CD_CVM')).to_numpy())
+    if conferir:
+        resultado.insert(1, 'CONSISTENTE', ~resultado.index.isin(pipeline.inconsistentes(plano)))
+    return resultado
@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+
+from cvm_dados import baixar_arquivo
+from indicadores import Plano
+from mercado import INDICADORES_MERCADO
+from pipeline import Pipeline
+
+# Cadastro de companhias da CVM: SETOR_ATIV agrupa os pares.
+URL_CADASTRO = 'http://dados.cvm.gov.br/dados/CIA_ABERTA/CAD/DADOS/cad_cia_aberta.csv'
+SEM_SETOR = 'Sem setor'
+QUANTIS = (0.25, 0.5, 0.75)
+
+
+# O DFP traz CD_CVM com zeros à esquerda ('017450') e o cadastro às vezes
+# sem ('17450'); os dois lados são comparados sem eles.
+def _chave_cvm(valores):
+    return pd.Index(valores).astype(str).str.lstrip('0')
+
+
+def carregar_setores(url=URL_CADASTRO):
+    cadastro = pd.read_csv(baixar_arquivo(url), sep=';', encoding='iso-8859-1', dtype=str,
+                           usecols=['CD_CVM', 'SETOR_ATIV'])
+    cadastro = cadastro.dropna().drop_duplicates('CD_CVM', keep='last')
+    return pd.Series(cadastro['SETOR_ATIV'].to_numpy(), index=_chave_cvm(cadastro['CD_CVM']), name='Setor')
+
+
+# setores: Series ou dict CD_CVM -> grupo (setor da CVM ou uma lista de
+# pares montada à mão); None lê o cadastro da CVM.
+def _setor_por_linha(indice, setores):
+    if setores is None:
+        setores = carregar_setores()
+    setores = pd.Series(setores)
+    setores.index = _chave_cvm(setores.index)
+    setores = setores[~setores.index.duplicated(keep='last')]
+    return setores.reindex(_chave_cvm(indice.get_level_values('CD_CVM'))).fillna(SEM_SETOR).to_numpy()
+
+
+def _nome_quantil(q):
+    return 'mediana' if q == 0.5 else f'p{q * 100:g}'
+
+
+# Núcleo das estatísticas por grupo: valores (linhas × indicadores) e o
+# código do grupo de cada linha. Uma ordenação por (grupo, valor) por coluna
+# dá de uma vez quantis, média, desvio, z-score e percentil de todas as
+# linhas de todos os grupos. NaN e inf (indicador indefinido, ano faltando) ficam
+# de fora das estatísticas e recebem NaN.
+def _estatisticas(valores, grupos, n_grupos, quantis):
+    n_linhas, n_colunas = valores.shape
+    finitos = np.isfinite(valores)
+    limpos = np.where(finitos, valores, np.nan)
+    inicio = np.concatenate([[0], np.cumsum(np.bincount(grupos, minlength=n_grupos))[:-1]])
+    resultado = {'n': np.zeros((n_grupos, n_colunas)), 'media': np.full((n_grupos, n_colunas), np.nan),
+                 'desvio': np.full((n_grupos, n_colunas), np.nan)}
+    for q in quantis:
+        resultado[_nome_quantil(q)] = np.full((n_grupos, n_colunas), np.nan)
+    z = np.full(valores.shape, np.nan)
+    percentil = np.full(valores.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for j in range(n_colunas):
+            n = np.bincount(grupos, weights=finitos[:, j], minlength=n_grupos)
+            media = np.bincount(grupos, weights=np.where(finitos[:, j], valores[:, j], 0.0), minlength=n_grupos) / n
+            desvios = np.where(finitos[:, j], valores[:, j] - media[grupos], 0.0)
+            desvio = np.sqrt(np.bincount(grupos, weights=desvios ** 2, minlength=n_grupos) / (n - 1))
+            # grupo constante: o que sobra é só arredondamento da média
+            desvio[desvio <= 1e-9 * np.abs(media)] = 0.0
+            resultado['n'][:, j] = n
+            resultado['media'][:, j] = np.where(n > 0, media, np.nan)
+            resultado['desvio'][:, j] = np.where(n > 1, desvio, np.nan)
+            z[:, j] = np.where(finitos[:, j] & (desvio[grupos] > 0), desvios / desvio[grupos], np.nan)
+
+            # NaN vai para o fim de cada grupo, então os n primeiros são os válidos
+            ordem = np.lexsort((limpos[:, j], grupos))
+            ordenados = limpos[ordem, j]
+            for q in quantis:
+                posicao = inicio + q * np.maximum(n - 1, 0)
+                abaixo = np.floor(posicao).astype('int64')
+                acima = np.ceil(posicao).astype('int64')
+                abaixo, acima = np.minimum(abaixo, n_linhas - 1), np.minimum(acima, n_linhas - 1)
+                interpolado = ordenados[abaixo] + (ordenados[acima] - ordenados[abaixo]) * (posicao - abaixo)
+                resultado[_nome_quantil(q)][:, j] = np.where(n > 0, interpolado, np.nan)
+
+            # percentil com empates pela média das posições, como rank(pct=True)
+            g = grupos[ordem]
+            novo = np.ones(n_linhas, dtype=bool)
+            novo[1:] = (g[1:] != g[:-1]) | (ordenados[1:] != ordenados[:-1])
+            posicoes = np.arange(n_linhas)
+            primeira = np.maximum.accumulate(np.where(novo, posicoes, 0))
+            fim = np.ones(n_linhas, dtype=bool)
+            fim[:-1] = novo[1:]
+            ultima = np.minimum.accumulate(np.where(fim, posicoes, n_linhas)[::-1])[::-1]
+            rank = ((primeira + ultima) / 2 - inicio[g] + 1) / n[g] * 100
+            percentil[ordem, j] = np.where(np.isnan(ordenados), np.nan, rank)
+    return resultado, z, percentil
+
+
+# Comparação com os pares a partir de uma tabela de indicadores por
+# (CD_CVM, Ano) ou (CD_CVM, Trimestre), como a de indicadores_mercado:
+#   agregados  (Setor, período) × (indicador, estatística): n, média,
+#              desvio, quantis (mediana, p25, p75, ...)
+#   z, percentil  mesma forma da tabela: posição de cada companhia no setor
+#              naquele período
+# Tudo sai de uma passada agrupada sobre a matriz de indicadores.
+class Pares:
+    def __init__(self, tabela, setores=None, quantis=QUANTIS):
+        tabela = tabela.select_dtypes('number')
+        periodo = [n for n in tabela.index.names if n != 'CD_CVM'][0]
+        self.setor = pd.Series(_setor_por_linha(tabela.index, setores), index=tabela.index, name='Setor')
+        chaves = pd.MultiIndex.from_arrays([self.setor.to_numpy(), tabela.index.get_level_values(periodo)],
+                                           names=['Setor', periodo])
+        grupos, unicos = pd.factorize(chaves)
+        resultado, z, percentil = _estatisticas(tabela.to_numpy(dtype='float64'), grupos, len(unicos), quantis)
+
+        unicos = pd.MultiIndex.from_tuples(unicos, names=['Setor', periodo])
+        colunas = pd.MultiIndex.from_product([tabela.columns, list(resultado)], names=['indicador', 'estatistica'])
+        blocos = np.stack(list(resultado.values()), axis=-1).reshape(len(unicos), -1)
+        self.agregados = pd.DataFrame(blocos, index=unicos, columns=colunas).sort_index()
+        self.z = pd.DataFrame(z, index=tabela.index, columns=tabela.columns)
+        self.percentil = pd.DataFrame(percentil, index=tabela.index, columns=tabela.columns)
+        self.tabela = tabela
+        self.periodo = periodo
+
+    # uma companhia contra o seu setor: valor, mediana, z e percentil por
+    # período e indicador
+    def companhia(self, cd_cvm):
+        linhas = self.tabela.xs(cd_cvm, level='CD_CVM', drop_level=False)
+        chaves = pd.MultiIndex.from_arrays([self.setor.loc[linhas.index].to_numpy(),
+                                            linhas.index.get_level_values(self.periodo)])
+        mediana = self.agregados.xs('mediana', level='estatistica', axis=1).reindex(chaves)
+        return pd.concat({'valor': linhas.droplevel('CD_CVM'),
+                          'mediana_setor': mediana.set_axis(linhas.index.droplevel('CD_CVM')),
+                          'z': self.z.loc[linhas.index].droplevel('CD_CVM'),
+                          'percentil': self.percentil.loc[linhas.index].droplevel('CD_CVM')}, axis=1)
+
+
+# Quantis aproximados em memória limitada: cada (grupo, indicador) guarda no
+# máximo 'tamanho' centróides (média, peso). Cada lote novo é juntado aos
+# centróides, ordenado e recomprimido em faixas de peso igual, então o erro
+# de posição fica em torno de 1/tamanho e a série histórica inteira passa
+# ano a ano sem guardar as linhas.
+class QuantisAproximados:
+    def __init__(self, tamanho=200):
+        self.tamanho = tamanho
+        self.centroides = {}
+
+    def adicionar(self, chave, valores):
+        valores = np.asarray(valores, dtype='float64')
+        valores = valores[np.isfinite(valores)]
+        if not len(valores):
+            return
+        medias, pesos = self.centroides.get(chave, (np.empty(0), np.empty(0)))
+        medias = np.concatenate([medias, valores])
+        pesos = np.concatenate([pesos, np.ones(len(valores))])
+        if len(medias) > self.tamanho:
+            ordem = np.argsort(medias, kind='stable')
+            medias, pesos = medias[ordem], pesos[ordem]
+            acumulado = np.cumsum(pesos)
+            faixas = np.minimum(((acumulado - pesos / 2) / acumulado[-1] * self.tamanho).astype('int64'),
+                                self.tamanho - 1)
+            novos_pesos = np.bincount(faixas, weights=pesos, minlength=self.tamanho)
+            novas_medias = np.bincount(faixas, weights=medias * pesos, minlength=self.tamanho)
+            usadas = novos_pesos > 0
+            medias, pesos = novas_medias[usadas] / novos_pesos[usadas], novos_pesos[usadas]
+        self.centroides[chave] = (medias, pesos)
+
+    def quantil(self, chave, q):
+        if chave not in self.centroides:
+            return np.nan
+        medias, pesos = self.centroides[chave]
+        ordem = np.argsort(medias, kind='stable')
+        medias, pesos = medias[ordem], pesos[ordem]
+        posicoes = (np.cumsum(pesos) - pesos / 2) / pesos.sum()
+        return float(np.interp(q, posicoes, medias))
+
+    def contagem(self, chave):
+        return float(self.centroides[chave][1].sum()) if chave in self.centroides else 0.0
+
+
+# Quantis por setor sobre um histórico longo: um ano de cada vez, com um
+# pipeline descartado ao fim do ano, de modo que só os centróides ficam em
+# memória. Devolve Setor × (indicador, quantil).
+def quantis_historicos(anos, nomes=INDICADORES_MERCADO, setores=None, quantis=QUANTIS, tamanho=200,
+                       tipo_demonstrativo='con'):
+    plano = Plano(nomes)
+    setores = carregar_setores() if setores is None else setores
+    esboco = QuantisAproximados(tamanho)
+    colunas = None
+    for ano in anos:
+        tabela = Pipeline(None, [int(ano)], 'DFP', tipo_demonstrativo).calcular(plano)
+        colunas = tabela.columns
+        grupos = pd.Series(_setor_por_linha(tabela.index, setores), index=tabela.index)
+        for setor, linhas in tabela.groupby(grupos.to_numpy()):
+            for coluna in colunas:
+                esboco.adicionar((setor, coluna), linhas[coluna].to_numpy())
+    if colunas is None:
+        return pd.DataFrame()
+    setores_vistos = sorted({setor for setor, _ in esboco.centroides})
+    dados = {(coluna, _nome_quantil(q)): [esboco.quantil((setor, coluna), q) for setor in setores_vistos]
+             for coluna in colunas for q in quantis}
+    resultado = pd.DataFrame(dados, index=pd.Index(setores_vistos, name='Setor'))
+    resultado.columns.names = ['indicador', 'estatistica']
+    return resultado
@@ -0,0 +1,177 @@
+import pandas as pd
+import requests
+
+from contas import TOLERANCIA, ArvoreContas, PainelContas
+from cvm_armazem import carregar_demonstrativo, preparar_anos
+from indicadores import Plano
+
+
+# Carregamento compartilhado: para um conjunto de companhias e um intervalo de
+# anos, cada demonstrativo de cada ano é lido uma única vez e o mesmo
+# DataFrame (e o mesmo PainelContas) é entregue a analises, às duas DuPont,
+# aos laços BPAs/DREs e aos gráficos. cd_cvm pode ser um código (painel por
+# ano), um conjunto de códigos ou None para o mercado todo (painel por
+# companhia e ano).
+class Pipeline:
+    def __init__(self, cd_cvm, year_range, tipo_periodo='DFP', tipo_demonstrativo='con'):
+        self.cd_cvm = cd_cvm
+        self.anos = list(year_range)
+        self.tipo_periodo = tipo_periodo
+        self.tipo_demonstrativo = tipo_demonstrativo
+        self.chaves = ('Ano',) if isinstance(cd_cvm, str) else ('CD_CVM', 'Ano')
+        self.carregamentos = 0
+        self._por_ano = {}
+        self._paineis = {}
+        self._arvores = {}
+        self._preparados = set()
+
+    # Abre em paralelo os anos ainda não vistos antes de lê-los um a um; só
+    # os membros dos demonstrativos pedidos vão para o armazém.
+    def _preparar(self, anos, cods):
+        pendentes = {(ano, cod) for ano in anos for cod in cods} - self._preparados
+        if pendentes:
+            membros = sorted({f'{cod}_{self.tipo_demonstrativo}' for _, cod in pendentes})
+            preparar_anos(sorted({ano for ano, _ in pendentes}), self.tipo_periodo, demonstrativos=membros)
+            self._preparados.update(pendentes)
+
+    # Anos que só entram como anterior: o arquivo pode não existir (antes do
+    # primeiro DFP do espelho ou do portal). Esses ficam de fora e medio usa
+    # o saldo do próprio ano, como sem histórico.
+    def _disponiveis(self, anos, cods):
+        try:
+            self._preparar(anos, cods)
+            return set(anos)
+        except (FileNotFoundError, requests.HTTPError):
+            disponiveis = set()
+            for ano in anos:
+                try:
+                    self._preparar([ano], cods)
+                except (FileNotFoundError, requests.HTTPError):
+                    continue
+                disponiveis.add(ano)
+            return disponiveis
+
+    def _carregar(self, cod, ano):
+        if (cod, ano) not in self._por_ano:
+            self._preparar([ano], [cod])
+            df = carregar_demonstrativo(ano, cod, self.tipo_periodo, self.tipo_demonstrativo, cd_cvm=self.cd_cvm)
+            self._por_ano[(cod, ano)] = df.assign(Ano=ano)
+            self.carregamentos += 1
+        return self._por_ano[(cod, ano)]
+
+    def demonstrativo(self, cod, anos=None):
+        anos = self.anos if anos is None else anos
+        self._preparar(anos, [cod])
+        return pd.concat([self._carregar(cod, int(ano)) for ano in anos], ignore_index=True)
+
+    # linhas de um ano como relatorio_cias_abertas devolveria, em cópia
+    def ano(self, cod, ano):
+        return self._carregar(cod, int(ano)).drop(columns='Ano')
+
+    # linhas do exercício de cada ano, com CD_CVM como texto no painel por
+    # companhia
+    def _exercicio(self, cod, anos):
+        df = self.demonstrativo(cod, anos)
+        df = df[df['DT_FIM_EXERC'].dt.year == df['Ano']]
+        if 'CD_CVM' in self.chaves:
+            df = df.assign(CD_CVM=df['CD_CVM'].astype(str))
+        return df
+
+    def painel(self, cod, anos=None):
+        anos = tuple(self.anos if anos is None else anos)
+        if (cod, anos) not in self._paineis:
+            self._paineis[(cod, anos)] = PainelContas(self._exercicio(cod, anos), self.chaves)
+        return self._paineis[(cod, anos)]
+
+    def arvore(self, cod, anos=None):
+        anos = tuple(self.anos if anos is None else anos)
+        if (cod, anos) not in self._arvores:
+            self._arvores[(cod, anos)] = ArvoreContas(self._exercicio(cod, anos), self.chaves)
+        return self._arvores[(cod, anos)]
+
+    # (companhia e) anos em que algum demonstrativo do plano tem um pai que
+    # não bate com a soma dos filhos
+    def inconsistentes(self, plano, anos=None, tolerancia=TOLERANCIA):
+        anos = self.anos if anos is None else [int(a) for a in anos]
+        quebrados = [self.arvore(cod, anos).quebrados(tolerancia) for cod in plano.demonstrativos]
+        return quebrados[0].append(quebrados[1:]).unique() if quebrados else pd.Index([])
+
+    # Tabela (companhia e) ano × conta com o que o plano usa, nos anos
+    # pedidos, mais o ano anterior apenas onde há saldo médio (e se
+    # com_anterior, para quem já tem o ano anterior guardado em outro lugar)
+    # e o arquivo desse ano existe.
+    def saldos(self, plano, anos=None, com_anterior=True):
+        anos = self.anos if anos is None else [int(a) for a in anos]
+        if com_anterior:
+            necessarios = plano.anos_por_demonstrativo(anos)
+        else:
+            necessarios = {cod: anos for cod in plano.demonstrativos}
+        self._preparar(anos, list(necessarios))
+        anteriores = {a for anos_cod in necessarios.values() for a in anos_cod} - set(anos)
+        faltando = anteriores - self._disponiveis(anteriores, [cod for cod, anos_cod in necessarios.items()
+                                                               if not anteriores.isdisjoint(anos_cod)])
+        necessarios = {cod: [a for a in anos_cod if a not in faltando] for cod, anos_cod in necessarios.items()}
+        return plano.painel({cod: self.painel(cod, anos_cod) for cod, anos_cod in necessarios.items()})
+
+    # Avaliação preguiçosa: carrega só os demonstrativos que o plano usa, nos
+    # anos pedidos, mais o ano anterior apenas onde há saldo médio. Com
+    # descartar_inconsistentes, as linhas de arquivos quebrados saem NaN em
+    # vez de chegar aos indicadores.
+    def calcular(self, plano, anos=None, descartar_inconsistentes=False):
+        anos = self.anos if anos is None else [int(a) for a in anos]
+        resultado = plano.avaliar_painel(self.saldos(plano, anos))
+        resultado = resultado[resultado.index.get_level_values('Ano').isin(anos)]
+        if descartar_inconsistentes:
+            resultado = resultado.copy()
+            resultado.loc[resultado.index.isin(self.inconsistentes(plano, anos))] = float('nan')
+        return resultado
+
+    def cobre(self, ano=None, cd_cvms=None):
+        if ano is not None and int(ano) not in self.anos and all(a != int(ano) for _, a in self._por_ano):
+            return False
+        if cd_cvms is None or self.cd_cvm is None:
+            return True
+        proprios = {self.cd_cvm} if isinstance(self.cd_cvm, str) else set(self.cd_cvm)
+        return not proprios.isdisjoint(cd_cvms)
+
+    # descarta o que foi carregado (um demonstrativo, um ano ou tudo); a
+    # próxima consulta relê do armazém
+    def invalidar(self, cod=None, ano=None):
+        for chave in [c for c in self._por_ano if (cod is None or c[0] == cod) and (ano is None or c[1] == int(ano))]:
+            del self._por_ano[chave]
+        for cache in (self._paineis, self._arvores):
+            for chave in [c for c in cache if (cod is None or c[0] == cod) and (ano is None or int(ano) in c[1])]:
+                del cache[chave]
+
+
+_PIPELINES = {}
+
+
+def _chave_companhias(cd_cvm):
+    if cd_cvm is None or isinstance(cd_cvm, str):
+        return cd_cvm
+    return frozenset(cd_cvm)
+
+
+def obter_pipeline(cd_cvm, year_range, tipo_periodo='DFP', tipo_demonstrativo='con'):
+    chave = (_chave_companhias(cd_cvm), tuple(year_range), tipo_periodo.upper(), tipo_demonstrativo)
+    if chave not in _PIPELINES:
+        _PIPELINES[chave] = Pipeline(cd_cvm, year_range, tipo_periodo, tipo_demonstrativo)
+    return _PIPELINES[chave]
+
+
+# Esquece pipelines em memória: todos, ou só os que cobrem o ano e/ou as
+# companhias indicados. A assinatura é a de ao_mudar em
+# cvm_armazem.atualizar, para invalidar só o que a atualização mudou.
+def invalidar_pipelines(ano=None, cd_cvms=None):
+    for chave, pipeline in list(_PIPELINES.items()):
+        if pipeline.cobre(ano, cd_cvms):
+            del _PIPELINES[chave]
+
+
+# Ponto de entrada para quem só quer alguns indicadores, por exemplo
+# calcular_indicadores(['ROE', 'divida_liquida_sobre_EBITDA'], '017450',
+# range(2020, 2024)): o plano decide quais demonstrativos, contas e anos
+# ler, e nada além disso é carregado.
+def calcular_indicadores(nomes, cd_cvm, anos, tipo_periodo='DFP', tipo_demonstrativo='con'):
+    return obter_pipeline(cd_cvm, anos, tipo_periodo, tipo_demonstrativo).calcular(Plano(nomes))
@@ -0,0 +1,137 @@
+import hashlib
+import http.server
+import io
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cvm_armazem  # noqa: E402
+import cvm_dados  # noqa: E402
+import pipeline  # noqa: E402
+
+CABECALHO = ['CNPJ_CIA', 'DT_REFER', 'VERSAO', 'DENOM_CIA', 'CD_CVM', 'GRUPO_DFP', 'MOEDA', 'ESCALA_MOEDA',
+             'ORDEM_EXERC', 'DT_INI_EXERC', 'DT_FIM_EXERC', 'CD_CONTA', 'DS_CONTA', 'VL_CONTA', 'ST_CONTA_FIXA']
+BALANCOS = ('BPA', 'BPP')
+
+
+# ZIP no layout da CVM a partir das linhas de cada membro: {nome do membro:
+# [{coluna: valor}]}, com as colunas omitidas preenchidas como num DFP
+# consolidado de versão 1. Membros de balanço não têm DT_INI_EXERC.
+def zip_membros(membros):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for nome, linhas in membros.items():
+            cabecalho = [c for c in CABECALHO if c != 'DT_INI_EXERC' or not any(f'_{b}_' in nome for b in BALANCOS)]
+            texto = [';'.join(cabecalho)]
+            for linha in linhas:
+                cd_cvm, fim = linha['CD_CVM'], linha['DT_FIM_EXERC']
+                campos = {'CNPJ_CIA': f'00.000.{cd_cvm[-3:]}/0001-00', 'DT_REFER': fim, 'VERSAO': '1',
+                          'DENOM_CIA': f'CIA {cd_cvm}', 'GRUPO_DFP': 'DF Consolidado', 'MOEDA': 'REAL',
+                          'ESCALA_MOEDA': 'MIL', 'ORDEM_EXERC': 'ÚLTIMO', 'DT_INI_EXERC': f'{fim[:4]}-01-01',
+                          'DS_CONTA': f'Conta {linha["CD_CONTA"]}', 'ST_CONTA_FIXA': 'S'}
+                campos.update(linha)
+                campos['VL_CONTA'] = f'{campos["VL_CONTA"]:.2f}'
+                texto.append(';'.join(str(campos[c]) for c in cabecalho))
+            zf.writestr(nome, '\n'.join(texto).encode('iso-8859-1'))
+    return buffer.getvalue()
+
+
+# ZIP anual no layout da CVM. demonstrativos: {cod: {cd_cvm: {cd_conta:
+# valor ou (ds_conta, valor)}}}, tudo como ORDEM_EXERC ÚLTIMO do ano.
+def zip_cvm(ano, demonstrativos, tipo_periodo='DFP'):
+    membros = {}
+    for cod, companhias in demonstrativos.items():
+        linhas = membros.setdefault(f'{tipo_periodo.lower()}_cia_aberta_{cod}_con_{ano}.csv', [])
+        for cd_cvm, contas in companhias.items():
+            for cd_conta, valor in contas.items():
+                ds_conta, valor = valor if isinstance(valor, tuple) else (f'Conta {cd_conta}', valor)
+                linhas.append({'CD_CVM': cd_cvm, 'DT_FIM_EXERC': f'{ano}-12-31', 'CD_CONTA': cd_conta,
+                               'DS_CONTA': ds_conta, 'VL_CONTA': valor})
+    return zip_membros(membros)
+
+
+# Fonte em memória, cache e armazém em diretórios temporários e nenhum
+# pipeline ou ZIP aberto vindo de outro teste.
+@pytest.fixture
+def fonte(tmp_path, monkeypatch):
+    memoria = cvm_dados.FonteMemoria()
+    monkeypatch.setattr(cvm_dados, 'FONTE', memoria)
+    monkeypatch.setattr(cvm_dados, 'CACHE', cvm_dados.CacheArquivos(str(tmp_path / 'cache')))
+    monkeypatch.setattr(cvm_armazem, 'ARMAZEM_DIR', str(tmp_path / 'armazem'))
+    cvm_dados.REGISTRO.fechar()
+    pipeline._PIPELINES.clear()
+    yield memoria
+    cvm_dados.REGISTRO.fechar()
+    pipeline._PIPELINES.clear()
+
+
+# Servidor HTTP local com ETag, If-None-Match (304), If-Range e Range (206,
+# ou 416 pedindo além do fim), como o portal da CVM. arquivos: {caminho:
+# bytes}; pedidos guarda (caminho, Range) de cada GET; atraso, em segundos,
+# é a pausa entre pedaços de 64 KB do corpo.
+class _Servidor(http.server.BaseHTTPRequestHandler):
+    arquivos = {}
+    pedidos = []
+    atraso = 0
+
+    @staticmethod
+    def etag(corpo):
+        return f'"{hashlib.sha1(corpo).hexdigest()}"'
+
+    def do_GET(self):
+        corpo = self.arquivos.get(self.path)
+        if corpo is None:
+            self.send_error(404)
+            return
+        faixa = self.headers.get('Range')
+        self.pedidos.append((self.path, faixa))
+        etag = self.etag(corpo)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        if faixa and self.headers.get('If-Range', etag) == etag:
+            inicio, fim = re.match(r'bytes=(\d+)-(\d*)', faixa).groups()
+            inicio, fim = int(inicio), min(int(fim) if fim else len(corpo) - 1, len(corpo) - 1)
+            if inicio >= len(corpo):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(corpo)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {inicio}-{fim}/{len(corpo)}')
+            corpo = corpo[inicio:fim + 1]
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        for inicio in range(0, len(corpo), 64 * 1024):
+            self.wfile.write(corpo[inicio:inicio + 64 * 1024])
+            if self.atraso:
+                time.sleep(self.atraso)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    tratador = type('Tratador', (_Servidor,), {'arquivos': {}, 'pedidos': []})
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), tratador)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    tratador.base = f'http://127.0.0.1:{httpd.server_address[1]}'
+    yield tratador
+    httpd.shutdown()
+    httpd.server_close()
@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+
+import cvm_armazem
+from conftest import zip_cvm
+from cvm_armazem import atualizar, carregar_demonstrativo, manifesto_membro
+
+
+def _ano(lucro_002):
+    return {'BPA': {'001': {'1': 100.0}, '002': {'1': 200.0}},
+            'DRE': {'001': {'3.11': 10.0}, '002': {'3.11': lucro_002}}}
+
+
+def test_manifesto_independe_da_ordem_das_linhas():
+    df = pd.DataFrame({'CD_CVM': ['001', '001', '002'], 'VERSAO': [1, 2, 1], 'VL_CONTA': [1.0, 2.0, 3.0]})
+
+    manifesto = manifesto_membro(df)
+
+    assert manifesto == manifesto_membro(df.iloc[::-1])
+    assert [manifesto['001'][0], manifesto['002'][0]] == [2, 1]
+
+
+# republicação com a DRE de uma companhia mudada: só ela volta, e ao_mudar
+# é chamado uma vez
+def test_atualizar_devolve_so_o_que_mudou(fonte):
+    fonte.adicionar(2020, 'DFP', zip_cvm(2020, _ano(20.0)))
+    chamadas = []
+
+    primeira = atualizar([2020], 'DFP', ao_mudar=lambda ano, cds: chamadas.append((ano, cds)))
+    assert primeira == {2020: {'001': {'BPA_con', 'DRE_con'}, '002': {'BPA_con', 'DRE_con'}}}
+
+    chamadas.clear()
+    fonte.adicionar(2020, 'DFP', zip_cvm(2020, _ano(25.0)))
+    mudancas = atualizar([2020], 'DFP', ao_mudar=lambda ano, cds: chamadas.append((ano, cds)))
+
+    assert mudancas == {2020: {'002': {'DRE_con'}}}
+    assert chamadas == [(2020, {'002'})]
+    dre = carregar_demonstrativo(2020, 'DRE', 'DFP', 'con', cd_cvm='002')
+    assert dre['VL_CONTA'].tolist() == [25.0]
+    assert atualizar([2020], 'DFP') == {}
+
+
+# ano ingerido só em parte: a atualização confere os membros que estão no
+# armazém e não ingere os outros
+def test_atualizar_ano_ingerido_em_parte(fonte):
+    fonte.adicionar(2020, 'DFP', zip_cvm(2020, _ano(20.0)))
+    carregar_demonstrativo(2020, 'BPA', 'DFP', 'con')
+    fonte.adicionar(2020, 'DFP', zip_cvm(2020, _ano(25.0)))
+
+    assert atualizar([2020], 'DFP') == {}
+    assert not os.path.exists(cvm_armazem.caminho_particao(2020, 'DRE', 'DFP', 'con'))
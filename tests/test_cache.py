@@ -0,0 +1,122 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from cvm_dados import CacheArquivos
+
+CORPO = bytes(range(256)) * 40
+
+
+def _parcial(cache, url, corpo, etag):
+    parcial, meta_parcial = cache._parciais(url)
+    with open(parcial, 'wb') as f:
+        f.write(corpo)
+    with open(meta_parcial, 'w', encoding='utf-8') as f:
+        json.dump({'etag': etag, 'last_modified': None}, f)
+    return parcial
+
+
+# a queda foi depois do último bloco: o .part já é o arquivo inteiro e o
+# servidor responde 416 ao pedido do restante
+def test_parcial_completo_vai_para_o_cache(tmp_path, servidor):
+    servidor.arquivos['/a.zip'] = CORPO
+    url = servidor.base + '/a.zip'
+    cache = CacheArquivos(str(tmp_path))
+    parcial = _parcial(cache, url, CORPO, servidor.etag(CORPO))
+
+    with open(cache.caminho(url), 'rb') as f:
+        assert f.read() == CORPO
+    assert servidor.pedidos == [('/a.zip', f'bytes={len(CORPO)}-')]
+    assert not os.path.exists(parcial)
+
+
+# .part maior que o arquivo no servidor: é descartado e o download recomeça
+def test_parcial_invalido_recomeca(tmp_path, servidor):
+    servidor.arquivos['/a.zip'] = CORPO
+    url = servidor.base + '/a.zip'
+    cache = CacheArquivos(str(tmp_path))
+    _parcial(cache, url, CORPO + b'lixo', servidor.etag(CORPO))
+
+    with open(cache.caminho(url), 'rb') as f:
+        assert f.read() == CORPO
+    assert servidor.pedidos == [('/a.zip', f'bytes={len(CORPO) + 4}-'), ('/a.zip', None)]
+
+
+def _buscar(diretorio, url, fila):
+    try:
+        with open(CacheArquivos(diretorio).caminho(url), 'rb') as f:
+            fila.put(f.read() == CORPO * 20)
+    except Exception as erro:
+        fila.put(repr(erro))
+
+
+# workers em processos separados pedindo o mesmo arquivo ao mesmo tempo: um
+# baixa, os outros esperam e só revalidam; nenhum .part é compartilhado
+def test_processos_no_mesmo_cache(tmp_path, servidor):
+    servidor.arquivos['/a.zip'] = CORPO * 20
+    servidor.atraso = 0.01
+    url = servidor.base + '/a.zip'
+    contexto = multiprocessing.get_context('fork')
+    fila = contexto.Queue()
+    processos = [contexto.Process(target=_buscar, args=(str(tmp_path), url, fila)) for _ in range(4)]
+    for processo in processos:
+        processo.start()
+    resultados = [fila.get(timeout=60) for _ in processos]
+    for processo in processos:
+        processo.join()
+
+    assert resultados == [True] * 4
+    assert [faixa for _, faixa in servidor.pedidos] == [None] * 4
+    assert sorted(os.listdir(tmp_path / 'objetos')) == [hashlib.sha256(CORPO * 20).hexdigest() + '.zip']
+    assert CacheArquivos(str(tmp_path)).contem(url)
+
+
+# segunda leitura revalida com If-None-Match e recebe 304; sem revalidar,
+# nem vai ao servidor; conteúdo novo vira outro objeto
+def test_revalidacao(tmp_path, servidor):
+    servidor.arquivos['/a.zip'] = CORPO
+    url = servidor.base + '/a.zip'
+    cache = CacheArquivos(str(tmp_path))
+
+    primeiro = cache.caminho(url)
+    assert cache.caminho(url) == primeiro
+    assert cache.caminho(url, revalidar=False) == primeiro
+    assert len(servidor.pedidos) == 2
+
+    servidor.arquivos['/a.zip'] = CORPO[::-1]
+    with open(cache.caminho(url), 'rb') as f:
+        assert f.read() == CORPO[::-1]
+    assert len(servidor.pedidos) == 3
+
+
+def test_modo_offline(tmp_path, servidor):
+    servidor.arquivos['/a.zip'] = CORPO
+    url = servidor.base + '/a.zip'
+    offline = CacheArquivos(str(tmp_path), offline=True)
+
+    with pytest.raises(FileNotFoundError):
+        offline.caminho(url)
+    caminho = CacheArquivos(str(tmp_path)).caminho(url)
+    assert offline.caminho(url) == caminho
+    assert len(servidor.pedidos) == 1
+
+
+# LRU com conteúdo compartilhado: despejar a URL menos usada não apaga o
+# objeto que outra URL ainda usa, e o despejo continua até caber no limite
+def test_despejo_lru_com_conteudo_compartilhado(tmp_path, servidor):
+    outro = bytes(reversed(CORPO))
+    servidor.arquivos.update({'/a.zip': CORPO, '/b.zip': CORPO, '/c.zip': outro, '/d.zip': CORPO[:1000] * 10})
+    cache = CacheArquivos(str(tmp_path), limite_bytes=2 * len(CORPO))
+    url = {nome: f'{servidor.base}/{nome}.zip' for nome in 'abcd'}
+    for nome in 'bca':
+        cache.caminho(url[nome])
+        time.sleep(0.01)
+
+    cache.caminho(url['d'])
+
+    assert [cache.contem(url[nome]) for nome in 'abcd'] == [True, False, False, True]
+    assert len(os.listdir(tmp_path / 'objetos')) == 2
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from contas import ArvoreContas, PainelContas
+
+
+def _linhas(*linhas):
+    return pd.DataFrame(linhas, columns=['CD_CVM', 'Trimestre', 'CD_CONTA', 'DS_CONTA', 'VL_CONTA'])
+
+
+# busca pela descrição sem tabela larga: cada chave soma só as suas linhas,
+# chaves sem nenhuma linha achada ficam zero
+def test_contendo_soma_por_chave():
+    df = _linhas(('1', 2020, '6.02.01', 'Aquisição de Imobilizado', -10.0),
+                 ('1', 2020, '6.02.02', 'Aquisições do Intangível', -5.0),
+                 ('1', 2020, '6.02.03', 'Venda de Imobilizado', 3.0),
+                 ('2', 2020, '6.02.01', 'AQUISICAO DE IMOBILIZADO', -7.0),
+                 ('2', 2021, '6.01', 'Caixa Líquido Operacional', 40.0))
+    painel = PainelContas(df, ('CD_CVM', 'Trimestre'))
+
+    soma = painel.contendo('Aquisição de Imobilizado', 'Aquisições do Intangível')
+
+    assert soma.index.equals(painel.por_codigo.index)
+    assert soma.to_dict() == {('1', 2020): -15.0, ('2', 2020): -7.0, ('2', 2021): 0.0}
+    assert painel.descricao('venda de imobilizado').loc[('1', 2020)] == 3.0
+
+
+def test_contendo_com_janela():
+    trimestres = pd.period_range('2020Q1', '2020Q4', freq='Q')
+    df = _linhas(*[('1', t, '3.04.01', 'Depreciação', -1.0 * (k + 1)) for k, t in enumerate(trimestres)])
+    painel = PainelContas(df, ('CD_CVM', 'Trimestre')).janela(4)
+
+    assert list(painel.por_codigo.index) == [('1', trimestres[-1])]
+    assert painel.contendo('depreciação').iloc[0] == pytest.approx(-10.0)
+
+
+def _arvore(*linhas):
+    return ArvoreContas(pd.DataFrame(linhas, columns=['CD_CVM', 'Ano', 'CD_CONTA', 'VL_CONTA']))
+
+
+def test_pai_que_nao_bate_com_os_filhos():
+    arvore = _arvore(('001', 2020, '1', 100.0), ('001', 2020, '1.01', 60.0), ('001', 2020, '1.02', 30.0),
+                     ('002', 2020, '1', 100.0), ('002', 2020, '1.01', 60.0), ('002', 2020, '1.02', 39.5))
+
+    quebrados = arvore.conferir()
+
+    assert list(quebrados.index) == [('001', 2020, '1')]
+    assert quebrados.iloc[0].tolist() == [100.0, 90.0, 10.0]
+    assert list(arvore.quebrados()) == [('001', 2020)]
+
+
+# nível não declarado: o subtotal vem da soma dos filhos e o pai de cima
+# confere contra ele
+def test_nivel_nao_declarado_sai_da_soma_dos_filhos():
+    arvore = _arvore(('001', 2020, '1', 100.0), ('001', 2020, '1.01.01', 40.0), ('001', 2020, '1.01.02', 20.0),
+                     ('001', 2020, '1.02', 40.0))
+
+    assert arvore.subtotal('1.01').loc[('001', 2020)] == 60.0
+    assert np.isnan(arvore.subtotal('2').loc[('001', 2020)])
+    assert arvore.conferir().empty
+
+
+# lucro por ação e variação de caixa não são somas dos filhos
+def test_contas_sem_soma_ficam_de_fora():
+    arvore = _arvore(('001', 2020, '3.99', 1.5), ('001', 2020, '3.99.01', 0.5), ('001', 2020, '3.99.01.01', 0.2),
+                     ('001', 2020, '6.05', 10.0), ('001', 2020, '6.05.01', 100.0), ('001', 2020, '6.05.02', 110.0),
+                     ('001', 2020, '3.01', 5.0), ('001', 2020, '3.01.01', 9.0))
+
+    assert list(arvore.conferir().index) == [('001', 2020, '3.01')]
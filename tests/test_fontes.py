@@ -0,0 +1,51 @@
+import os
+
+import cvm_dados
+from conftest import zip_cvm
+from cvm_armazem import carregar_demonstrativo, ingerir_arquivo
+
+DEMONSTRATIVOS = {'DRE': {'022470': {'3.01': 1000.0, '3.11': 50.0}},
+                  'BPP': {'022470': {'2.03': 200.0}}}
+
+
+def _http(servidor, monkeypatch):
+    servidor.arquivos['/dfp_cia_aberta_2020.zip'] = zip_cvm(2020, DEMONSTRATIVOS)
+    fonte = cvm_dados.FonteHTTP(servidor.base, modelo='{base}/{tipo_min}_cia_aberta_{ano}.zip', parcial=True)
+    monkeypatch.setattr(cvm_dados, 'FONTE', fonte)
+    return fonte
+
+
+# modo parcial: um membro sai por Range, sem baixar nem guardar o arquivo
+def test_parcial_le_membro_por_range(fonte, servidor, monkeypatch):
+    _http(servidor, monkeypatch)
+
+    with cvm_dados.RegistroArquivos() as registro:
+        df = cvm_dados.ler_csv(registro.abrir(2020, 'DRE', 'DFP', 'con'))
+
+    assert sorted(df['CD_CONTA']) == ['3.01', '3.11']
+    assert all(faixa is not None for _, faixa in servidor.pedidos)
+    assert not cvm_dados.CACHE.contem(servidor.base + '/dfp_cia_aberta_2020.zip')
+
+
+# a ingestão do ano inteiro lê todos os membros: baixa o arquivo uma vez e
+# o deixa no cache, mesmo no modo parcial
+def test_ingestao_do_ano_no_modo_parcial_usa_o_cache(fonte, servidor, monkeypatch):
+    _http(servidor, monkeypatch)
+
+    ingerir_arquivo(2020, 'DFP')
+
+    assert sorted(carregar_demonstrativo(2020, 'DRE', 'DFP', 'con')['CD_CONTA']) == ['3.01', '3.11']
+    assert servidor.pedidos == [('/dfp_cia_aberta_2020.zip', None)]
+    assert cvm_dados.CACHE.contem(servidor.base + '/dfp_cia_aberta_2020.zip')
+    assert os.listdir(cvm_dados.CACHE.dir_objetos)
+
+
+# um demonstrativo só: no modo parcial, o membro vai para o armazém por Range
+def test_ingestao_de_um_membro_por_range(fonte, servidor, monkeypatch):
+    _http(servidor, monkeypatch)
+
+    df = carregar_demonstrativo(2020, 'DRE', 'DFP', 'con')
+
+    assert sorted(df['CD_CONTA']) == ['3.01', '3.11']
+    assert all(faixa is not None for _, faixa in servidor.pedidos)
+    assert not cvm_dados.CACHE.contem(servidor.base + '/dfp_cia_aberta_2020.zip')
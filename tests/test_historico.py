@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from conftest import zip_cvm
+from historico import Historico
+
+NOMES = ['ROE', 'dupont_t_alavancagem', 'PMRE']
+
+
+def _publicar(fonte):
+    for k, ano in enumerate(range(2015, 2018)):
+        fonte.adicionar(ano, 'DFP', zip_cvm(ano, {
+            'BPA': {'001': {'1': 1000.0 + 100 * k, '1.01.04': 50.0 + 10 * k},
+                    '002': {'1': 500.0 - 20 * k, '1.01.04': 30.0}},
+            'BPP': {'001': {'2.03': 400.0 + 50 * k}, '002': {'2.03': 250.0 + 5 * k}},
+            'DRE': {'001': {'3.02': -300.0, '3.11': 60.0 + k}, '002': {'3.02': -120.0 - k, '3.11': 20.0}},
+        }))
+
+
+# anexar o ano novo sobre a série guardada dá o mesmo que recalcular tudo,
+# inclusive nos indicadores com saldo médio
+@pytest.mark.parametrize('cd_cvm', ['001', None])
+def test_anexar_igual_a_calcular(fonte, tmp_path, cd_cvm):
+    _publicar(fonte)
+    incremental = Historico(NOMES, cd_cvm, diretorio=str(tmp_path / 'incremental'))
+    incremental.calcular([2015, 2016])
+
+    anexado = incremental.anexar(2017)
+    completo = Historico(NOMES, cd_cvm, diretorio=str(tmp_path / 'completo')).calcular([2015, 2016, 2017])
+
+    pd.testing.assert_frame_equal(anexado, completo.sort_index())
+    pd.testing.assert_frame_equal(incremental.ler(), anexado)
+
+
+def test_anexar_sem_as_contas_do_plano(fonte, tmp_path):
+    _publicar(fonte)
+    historico = Historico(NOMES, '001', diretorio=str(tmp_path))
+    historico.calcular([2015, 2016])
+    historico.ler_saldos().drop(columns='patrimonio_liquido').to_parquet(historico._caminho('saldos.parquet'))
+
+    with pytest.raises(ValueError, match='patrimonio_liquido'):
+        historico.anexar(2017)
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicadores import CONTAS, Plano
+
+
+def _saldos(**contas):
+    linha = {c: 0.0 for c in CONTAS}
+    linha.update(contas)
+    return pd.DataFrame([linha], index=pd.Index([2020], name='Ano'))
+
+
+# denominador zero é indicador indefinido, com qualquer sinal no numerador
+def test_divisao_por_zero_da_nan():
+    plano = Plano(['Margem_liquida', 'dupont_t_margem_liquida', 'dupont_a_kd', 'liquidez_corrente', 'ROE'])
+    resultado = plano.avaliar_painel(_saldos(lucro_liquido=-50.0, despesas_financeiras=-10.0,
+                                             ativo_circulante=100.0))
+
+    assert resultado.iloc[0].isna().all()
+
+
+def test_divisao_mantem_sinal():
+    plano = Plano(['Margem_liquida', 'liquidez_corrente'])
+    resultado = plano.avaliar_painel(_saldos(receita=200.0, lucro_liquido=-50.0,
+                                             ativo_circulante=30.0, passivo_circulante=20.0))
+
+    assert resultado['Margem_liquida'].iloc[0] == pytest.approx(-25.0)
+    assert resultado['liquidez_corrente'].iloc[0] == pytest.approx(1.5)
+    assert not np.isinf(resultado.to_numpy()).any()
@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+from cvm_dados import ler_csv
+
+CABECALHO = 'CNPJ_CIA;DT_REFER;VERSAO;DENOM_CIA;CD_CVM;ORDEM_EXERC;DT_INI_EXERC;DT_FIM_EXERC;CD_CONTA;DS_CONTA;VL_CONTA'
+
+
+# linhas: (CD_CVM, VERSAO, CD_CONTA, VL_CONTA como texto)
+def _csv(*linhas, dt_refer='2020-12-31'):
+    texto = [CABECALHO] + [f'00.000.000/0001-00;{dt_refer};{versao};CIA;{cd};ÚLTIMO;2020-01-01;2020-12-31;'
+                           f'{conta};Conta {conta};{valor}' for cd, versao, conta, valor in linhas]
+    return io.BytesIO('\n'.join(texto).encode('iso-8859-1'))
+
+
+# a reapresentação tirou 3.04.09: a linha da versão 1 não pode sobrar
+def test_reapresentacao_descarta_a_entrega_antiga_inteira():
+    df = ler_csv(_csv(('001', 1, '3.01', '10'), ('001', 1, '3.04.09', '7'),
+                      ('001', 2, '3.01', '12'), ('002', 1, '3.01', '5')))
+
+    assert sorted(zip(df['CD_CVM'], df['CD_CONTA'], df['VL_CONTA'])) == [('001', '3.01', 12.0),
+                                                                        ('002', '3.01', 5.0)]
+
+
+def test_reapresentacao_com_usecols():
+    df = ler_csv(_csv(('001', 1, '3.01', '10'), ('001', 1, '3.04.09', '7'), ('001', 2, '3.01', '12')),
+                 usecols=['CD_CONTA', 'VL_CONTA'])
+
+    assert list(df.columns) == ['CD_CONTA', 'VL_CONTA']
+    assert df['VL_CONTA'].tolist() == [pytest.approx(12.0)]
+
+
+@pytest.mark.parametrize('valores, esperados', [
+    (['1234.5600000000', '-7.5'], [1234.56, -7.5]),
+    (['1.234,56', '(7,5)'], [1234.56, -7.5]),
+    (['(1234.56)', '7.5'], [-1234.56, 7.5]),
+])
+def test_formatos_de_vl_conta(valores, esperados):
+    df = ler_csv(_csv(*[('001', 1, f'3.{k:02d}', v) for k, v in enumerate(valores)]))
+
+    assert df['VL_CONTA'].tolist() == pytest.approx(esperados)
+
+
+# a amostra (64 KB) só tem ponto decimal; o valor com vírgula vem depois e
+# o arquivo inteiro é relido com VL_CONTA como texto
+@pytest.mark.parametrize('tardio, esperado', [('1.234,5', 1234.5), ('(12.5)', -12.5)])
+def test_formato_diferente_depois_da_amostra(tardio, esperado):
+    linhas = [('001', 1, f'3.{k:04d}', f'{k}.25') for k in range(2000)] + [('001', 1, '9.99', tardio)]
+
+    df = ler_csv(_csv(*linhas), tamanho_bloco=500)
+
+    assert len(df) == 2001
+    assert df['VL_CONTA'].iloc[:2000].tolist() == pytest.approx([k + 0.25 for k in range(2000)])
+    assert df['VL_CONTA'].iloc[-1] == pytest.approx(esperado)
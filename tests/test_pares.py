@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pares import Pares, QuantisAproximados
+
+
+def _tabela():
+    rng = np.random.default_rng(7)
+    companhias = [f'{k:06d}' for k in range(40)]
+    indice = pd.MultiIndex.from_product([companhias, [2020, 2021]], names=['CD_CVM', 'Ano'])
+    tabela = pd.DataFrame({'ROE': rng.normal(10, 5, len(indice)).round(0),
+                           'liquidez_corrente': rng.lognormal(0, 0.5, len(indice))}, index=indice)
+    tabela.iloc[::7, 0] = np.nan
+    tabela.iloc[3::11, 1] = np.inf
+    tabela.iloc[5::13, 1] = -np.inf
+    setores = {cd: ('Energia', 'Bancos', 'Varejo')[k % 3] for k, cd in enumerate(companhias)}
+    # um setor de uma companhia só e um grupo constante
+    setores[companhias[0]] = 'Único'
+    tabela.loc[[cd for cd in companhias if setores[cd] == 'Bancos'], 'ROE'] = 12.0
+    return tabela, setores
+
+
+# mesmas estatísticas que o groupby do pandas, com NaN e inf fora
+def test_estatisticas_iguais_ao_pandas():
+    tabela, setores = _tabela()
+    pares = Pares(tabela, setores, quantis=(0.25, 0.5, 0.75))
+
+    limpos = tabela.replace([np.inf, -np.inf], np.nan)
+    grupos = [limpos.index.get_level_values('CD_CVM').map(setores).rename('Setor'),
+              limpos.index.get_level_values('Ano')]
+    agrupado = limpos.groupby(grupos)
+    esperado = {'n': agrupado.count(), 'media': agrupado.mean(), 'desvio': agrupado.std(),
+                'p25': agrupado.quantile(0.25), 'mediana': agrupado.median(), 'p75': agrupado.quantile(0.75)}
+    for estatistica, valores in esperado.items():
+        obtido = pares.agregados.xs(estatistica, level='estatistica', axis=1)
+        pd.testing.assert_frame_equal(obtido, valores.astype('float64').reindex(obtido.index),
+                                      check_names=False, atol=1e-9)
+
+    percentil = agrupado.rank(pct=True) * 100
+    pd.testing.assert_frame_equal(pares.percentil, percentil.reindex(tabela.index), atol=1e-9)
+    media, desvio = agrupado.transform('mean'), agrupado.transform('std')
+    z = ((limpos - media) / desvio).where(desvio > 0)
+    pd.testing.assert_frame_equal(pares.z, z, atol=1e-9)
+    assert pares.z.loc[pares.setor == 'Bancos', 'ROE'].isna().all()
+
+
+# erro de posição limitado a poucos por cento com 50 centróides para
+# 20 mil valores em lotes
+def test_quantis_aproximados():
+    rng = np.random.default_rng(3)
+    valores = rng.lognormal(0, 1, 20_000)
+    esboco = QuantisAproximados(tamanho=50)
+    for lote in np.array_split(valores, 40):
+        esboco.adicionar('g', lote)
+
+    assert esboco.contagem('g') == pytest.approx(20_000)
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+        posicao = (valores <= esboco.quantil('g', q)).mean()
+        assert abs(posicao - q) < 0.02
+    assert np.isnan(esboco.quantil('outro', 0.5))
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+import cvm_armazem
+from conftest import zip_cvm
+from historico import Historico
+from indicadores import Plano
+from mercado import indicadores_mercado
+from pipeline import Pipeline, calcular_indicadores
+
+
+def _balanco(pl):
+    return {'BPP': {'022470': {'2': pl * 2, '2.03': pl}}}
+
+
+def _ano(pl, lucro):
+    return {**_balanco(pl), 'DRE': {'022470': {'3.01': 1000.0, '3.11': lucro}}}
+
+
+# O primeiro ano do espelho não tem ano anterior: medio usa o saldo do
+# próprio ano em vez de falhar por falta do arquivo de 2014.
+def test_primeiro_ano_sem_anterior_usa_saldo_do_ano(fonte):
+    fonte.adicionar(2015, 'DFP', zip_cvm(2015, _ano(200.0, 50.0)))
+    fonte.adicionar(2016, 'DFP', zip_cvm(2016, _ano(300.0, 100.0)))
+
+    roe = calcular_indicadores(['ROE'], '022470', range(2015, 2017))['ROE']
+
+    assert roe.loc[2015] == pytest.approx(25.0)
+    assert roe.loc[2016] == pytest.approx(40.0)
+
+
+def test_historico_no_primeiro_ano(fonte, tmp_path):
+    fonte.adicionar(2015, 'DFP', zip_cvm(2015, _ano(200.0, 50.0)))
+
+    indicadores = Historico(['ROE'], '022470', diretorio=str(tmp_path / 'historico')).calcular([2015])
+
+    assert indicadores['ROE'].loc[2015] == pytest.approx(25.0)
+
+
+# o ano pedido continua obrigatório
+def test_ano_pedido_inexistente_falha(fonte):
+    fonte.adicionar(2016, 'DFP', zip_cvm(2016, _ano(300.0, 100.0)))
+
+    with pytest.raises(FileNotFoundError):
+        calcular_indicadores(['ROE'], '022470', range(2016, 2018))
+
+
+# quem entrega só a DFC pelo método direto não tem fluxo de caixa (NaN, fora
+# das estatísticas dos pares); quem entrega a DFC_MI sem as linhas de
+# aquisição tem capex zero
+def test_fluxo_de_caixa_sem_dfc_mi_fica_nan(fonte):
+    demonstrativos = {
+        'BPP': {'001': {'2.03': 100.0}, '002': {'2.03': 100.0}},
+        'DRE': {'001': {'3.01': 500.0}, '002': {'3.01': 500.0}},
+        'DFC_MI': {'001': {'6.01': 80.0}},
+        'DFC_MD': {'002': {'6.01': 70.0}},
+    }
+    fonte.adicionar(2020, 'DFP', zip_cvm(2020, demonstrativos))
+
+    tabela = calcular_indicadores(['fluxo_caixa_operacional', 'capex', 'fluxo_caixa_livre', 'capital_proprio'],
+                                  None, [2020])
+
+    assert tabela.loc[('001', 2020)].tolist() == [80.0, 0.0, 80.0, 100.0]
+    assert tabela.loc[('002', 2020), ['fluxo_caixa_operacional', 'capex', 'fluxo_caixa_livre']].isna().all()
+    assert tabela.loc[('002', 2020), 'capital_proprio'] == 100.0
+
+
+# só os membros do plano são lidos e gravados no armazém, e o _origem.json
+# registra quais
+def test_ingere_so_os_demonstrativos_do_plano(fonte, monkeypatch):
+    fonte.adicionar(2020, 'DFP', zip_cvm(2020, {'BPA': {'022470': {'1.01': 300.0}},
+                                               'BPP': {'022470': {'2.01': 200.0}},
+                                               'DRE': {'022470': {'3.01': 1000.0}},
+                                               'DVA': {'022470': {'7.01': 10.0}}}))
+    lidos = []
+    ingerir_membro = cvm_armazem._ingerir_membro
+
+    def contar(zf, nome, *args):
+        lidos.append(nome)
+        return ingerir_membro(zf, nome, *args)
+
+    monkeypatch.setattr(cvm_armazem, '_ingerir_membro', contar)
+
+    liquidez = calcular_indicadores(['liquidez_corrente'], '022470', [2020])['liquidez_corrente']
+    assert liquidez.loc[2020] == pytest.approx(1.5)
+    assert sorted(lidos) == ['dfp_cia_aberta_BPA_con_2020.csv', 'dfp_cia_aberta_BPP_con_2020.csv']
+    assert not cvm_armazem.ingerido(2020, 'DFP')
+    assert cvm_armazem.ingerido(2020, 'DFP', demonstrativos=['BPA_con', 'BPP_con'])
+
+    calcular_indicadores(['Margem_bruta'], '022470', [2020])
+    assert lidos[2:] == ['dfp_cia_aberta_DRE_con_2020.csv']
+
+
+# '002' declara um ativo que não bate com os filhos
+def _com_arquivo_quebrado(fonte):
+    fonte.adicionar(2020, 'DFP', zip_cvm(2020, {
+        'BPA': {'001': {'1': 100.0, '1.01': 60.0, '1.02': 40.0}, '002': {'1': 100.0, '1.01': 50.0, '1.02': 10.0}},
+        'BPP': {'001': {'2': 100.0, '2.01': 40.0, '2.03': 60.0}, '002': {'2': 100.0, '2.01': 25.0, '2.03': 75.0}},
+    }))
+
+
+def test_descartar_inconsistentes(fonte):
+    _com_arquivo_quebrado(fonte)
+    pipeline = Pipeline(None, [2020])
+    plano = Plano(['liquidez_corrente'])
+
+    todos = pipeline.calcular(plano)['liquidez_corrente']
+    consistentes = pipeline.calcular(plano, descartar_inconsistentes=True)['liquidez_corrente']
+
+    assert todos.to_dict() == {('001', 2020): 1.5, ('002', 2020): 2.0}
+    assert consistentes.loc[('001', 2020)] == 1.5
+    assert np.isnan(consistentes.loc[('002', 2020)])
+
+
+def test_mercado_com_conferencia(fonte):
+    _com_arquivo_quebrado(fonte)
+
+    tabela = indicadores_mercado([2020], ['liquidez_corrente'], conferir=True)
+
+    assert tabela['CONSISTENTE'].to_dict() == {('001', 2020): True, ('002', 2020): False}
+    assert tabela['DENOM_CIA'].tolist() == ['CIA 001', 'CIA 002']
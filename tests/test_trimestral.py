@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from conftest import zip_membros
+from trimestral import indicadores_trimestrais, trimestres_isolados
+
+FINS = ('03-31', '06-30', '09-30', '12-31')
+# por ano: receita e lucro de cada trimestre isolado e o PL no fim de cada um
+RECEITA = {2019: (80.0, 90.0, 95.0, 100.0), 2020: (100.0, 110.0, 120.0, 130.0)}
+LUCRO = {2019: (10.0, 20.0, 30.0, 40.0), 2020: (50.0, 60.0, 70.0, 80.0)}
+PL = {2019: (1000.0, 1000.0, 1000.0, 1000.0), 2020: (1200.0, 1400.0, 1600.0, 1800.0)}
+
+
+def _fluxo(ano, trimestre, conta, valores, isolado=False):
+    inicio = f'{ano}-{3 * trimestre - 2:02d}-01' if isolado else f'{ano}-01-01'
+    valor = valores[trimestre - 1] if isolado else sum(valores[:trimestre])
+    return {'CD_CVM': '001', 'DT_INI_EXERC': inicio, 'DT_FIM_EXERC': f'{ano}-{FINS[trimestre - 1]}',
+            'CD_CONTA': conta, 'VL_CONTA': valor}
+
+
+# ITR com os valores acumulados no ano (o de 2020 traz também o trimestre
+# isolado do 2º e do 3º); o DFP só com os doze meses
+def _publicar(fonte):
+    for ano in (2019, 2020):
+        dre_itr = [_fluxo(ano, t, conta, valores[ano])
+                   for t in (1, 2, 3) for conta, valores in (('3.01', RECEITA), ('3.11', LUCRO))]
+        if ano == 2020:
+            dre_itr += [_fluxo(ano, t, '3.01', RECEITA[ano], isolado=True) for t in (2, 3)]
+        bpp_itr = [{'CD_CVM': '001', 'DT_FIM_EXERC': f'{ano}-{FINS[t]}', 'CD_CONTA': '2.03', 'VL_CONTA': PL[ano][t]}
+                   for t in range(3)]
+        fonte.adicionar(ano, 'ITR', zip_membros({f'itr_cia_aberta_DRE_con_{ano}.csv': dre_itr,
+                                                 f'itr_cia_aberta_BPP_con_{ano}.csv': bpp_itr}))
+        dre_dfp = [_fluxo(ano, 4, conta, valores[ano]) for conta, valores in (('3.01', RECEITA), ('3.11', LUCRO))]
+        bpp_dfp = [{'CD_CVM': '001', 'DT_FIM_EXERC': f'{ano}-12-31', 'CD_CONTA': '2.03', 'VL_CONTA': PL[ano][3]}]
+        fonte.adicionar(ano, 'DFP', zip_membros({f'dfp_cia_aberta_DRE_con_{ano}.csv': dre_dfp,
+                                                 f'dfp_cia_aberta_BPP_con_{ano}.csv': bpp_dfp}))
+
+
+# 1º trimestre direto, 2º e 3º pelo trimestre isolado ou pela diferença dos
+# acumulados, 4º do DFP menos os nove meses
+def test_trimestres_isolados():
+    linhas = [_fluxo(2020, 1, '3.01', RECEITA[2020]), _fluxo(2020, 2, '3.01', RECEITA[2020]),
+              _fluxo(2020, 2, '3.01', RECEITA[2020], isolado=True), _fluxo(2020, 3, '3.01', RECEITA[2020]),
+              _fluxo(2020, 4, '3.01', RECEITA[2020])]
+    df = pd.DataFrame(linhas)
+    for coluna in ('DT_INI_EXERC', 'DT_FIM_EXERC'):
+        df[coluna] = pd.to_datetime(df[coluna])
+
+    isolados = trimestres_isolados(df).set_index('DT_FIM_EXERC')['VL_CONTA']
+
+    assert isolados.sort_index().tolist() == list(RECEITA[2020])
+
+
+# sem um trimestre no meio, o acumulado seguinte não vira trimestre isolado
+def test_trimestre_faltando_no_meio():
+    df = pd.DataFrame([_fluxo(2020, 1, '3.01', RECEITA[2020]), _fluxo(2020, 3, '3.01', RECEITA[2020])])
+    for coluna in ('DT_INI_EXERC', 'DT_FIM_EXERC'):
+        df[coluna] = pd.to_datetime(df[coluna])
+
+    assert trimestres_isolados(df)['VL_CONTA'].tolist() == [RECEITA[2020][0]]
+
+
+# receita em doze meses e ROE sobre o PL médio entre a data e o mesmo
+# trimestre do ano anterior; de 2019 só o 4º trimestre tem a janela completa
+# (e, sem 2018, o PL médio é o da data)
+def test_indicadores_ttm(fonte):
+    _publicar(fonte)
+
+    resultado = indicadores_trimestrais(['receita', 'ROE'], '001', [2019, 2020])
+
+    assert list(resultado.index) == list(pd.period_range('2019Q4', '2020Q4', freq='Q'))
+    assert resultado['receita'].tolist() == pytest.approx([365.0, 385.0, 405.0, 430.0, 460.0])
+    lucro = [100.0, 140.0, 180.0, 220.0, 260.0]
+    pl_medio = [1000.0, 1100.0, 1200.0, 1300.0, 1400.0]
+    assert resultado['ROE'].tolist() == [round(l / p * 100) for l, p in zip(lucro, pl_medio)]
@@ -0,0 +1,86 @@
+import pandas as pd
+import requests
+
+from contas import PainelContas
+from cvm_dados import filtrar_bloco
+from indicadores import Plano
+from pipeline import obter_pipeline
+
+# Demonstrativos de fluxo: no ITR vêm acumulados no exercício (3, 6 e 9
+# meses) e viram trimestres isolados antes da soma móvel. Os balanços são
+# posições e entram como estão, na data de cada trimestre.
+FLUXOS = ('DRE', 'DFC_MI', 'DFC_MD', 'DVA')
+
+
+def _rotular(df):
+    return df.assign(Trimestre=df['DT_FIM_EXERC'].dt.to_period('Q'))
+
+
+# Um demonstrativo de cada ano disponível; o DFP do ano corrente ainda não
+# publicado (ou um ITR que não existe) é só pulado.
+def _disponiveis(pipeline, cod, anos):
+    partes = []
+    for ano in anos:
+        try:
+            partes.append(pipeline.ano(cod, ano))
+        except (FileNotFoundError, requests.HTTPError):
+            continue
+    return partes
+
+
+# De valores acumulados no exercício para o trimestre isolado: fica, para
+# cada data de fim, o período que começa no início do exercício (o ITR traz
+# também o trimestre sozinho, o DFP só os doze meses) e dele se subtrai o
+# acumulado do trimestre anterior do mesmo exercício. O 4º trimestre sai do
+# DFP menos os nove meses do 3º ITR.
+def trimestres_isolados(df):
+    inicio = df.groupby(['CD_CVM', 'DT_FIM_EXERC'], observed=True)['DT_INI_EXERC'].transform('min')
+    df = df[df['DT_INI_EXERC'] == inicio]
+    meses = (df['DT_FIM_EXERC'].dt.year - df['DT_INI_EXERC'].dt.year) * 12 \
+        + df['DT_FIM_EXERC'].dt.month - df['DT_INI_EXERC'].dt.month + 1
+    df = df.assign(meses=meses).sort_values('DT_FIM_EXERC')
+    grupos = df.groupby(['CD_CVM', 'DT_INI_EXERC', 'CD_CONTA'], observed=True)
+    anterior = grupos['VL_CONTA'].shift()
+    meses_anterior = grupos['meses'].shift()
+    isolado = df['VL_CONTA'].fillna(0).where(df['meses'] == 3)
+    isolado = isolado.fillna((df['VL_CONTA'].fillna(0) - anterior.fillna(0)).where(meses_anterior == df['meses'] - 3))
+    return df.assign(VL_CONTA=isolado).dropna(subset=['VL_CONTA']).drop(columns='meses')
+
+
+# Indicadores trimestrais em base TTM (últimos doze meses): fluxos somados
+# nos quatro trimestres isolados até a data, balanços na data e médias
+# entre a data e o mesmo trimestre do ano anterior. Os ciclos seguem em 365
+# dias, já que o período é de doze meses. Um código CVM devolve um painel
+# por Trimestre; um conjunto ou None, por CD_CVM e Trimestre.
+def indicadores_trimestrais(nomes, cd_cvm, anos, tipo_demonstrativo='con'):
+    plano = Plano(nomes)
+    anos = [int(a) for a in anos]
+    chaves = ('Trimestre',) if isinstance(cd_cvm, str) else ('CD_CVM', 'Trimestre')
+    # o ano anterior completa a janela dos primeiros trimestres e dá o saldo
+    # do ano anterior para as médias
+    carga = sorted(set(anos) | {a - 1 for a in anos})
+    itr = obter_pipeline(cd_cvm, carga, 'ITR', tipo_demonstrativo)
+    dfp = obter_pipeline(cd_cvm, carga, 'DFP', tipo_demonstrativo)
+
+    paineis = {}
+    incompletos = []
+    for cod in plano.demonstrativos:
+        partes = _disponiveis(itr, cod, carga) + _disponiveis(dfp, cod, carga)
+        df = filtrar_bloco(pd.concat(partes, ignore_index=True), ordem_exerc='ÚLTIMO')
+        if 'CD_CVM' in chaves:
+            df = df.assign(CD_CVM=df['CD_CVM'].astype(str))
+        if cod in FLUXOS:
+            trimestres = PainelContas(_rotular(trimestres_isolados(df)), chaves)
+            paineis[cod] = trimestres.janela(4)
+            incompletos.append(trimestres.por_codigo.index.difference(paineis[cod].por_codigo.index))
+        else:
+            paineis[cod] = PainelContas(_rotular(df), chaves)
+
+    historico = plano.painel(paineis)
+    # só os trimestres dos anos pedidos com a janela de doze meses completa;
+    # quem não entrega um dos fluxos fica, com NaN nas contas dele
+    completos = historico.index
+    for faltando in incompletos:
+        completos = completos.difference(faltando)
+    completos = completos[completos.get_level_values('Trimestre').year.isin(anos)]
+    return plano.avaliar_painel(historico.loc[completos].sort_index(), historico)